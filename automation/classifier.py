@@ -1,13 +1,15 @@
 import json
 import re
 try:
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_shared_client
+    from automation.prompt_compactor import compact, CLASSIFIER_SUMMARY_TOKENS
 except ImportError:
-    from gemini_client import GeminiClient
+    from gemini_client import get_shared_client
+    from prompt_compactor import compact, CLASSIFIER_SUMMARY_TOKENS
 
 class ArticleClassifier:
-    def __init__(self):
-        self.gemini = GeminiClient()
+    def __init__(self, gemini_client=None):
+        self.gemini = gemini_client or get_shared_client()
         
     def classify_article(self, title, content_summary):
         """
@@ -20,6 +22,7 @@ class ArticleClassifier:
                 "theme_tags": ["slug1", "slug2"]
             }
         """
+        content_summary = compact(content_summary, CLASSIFIER_SUMMARY_TOKENS)
         
         prompt = f"""
         You are an Editor for the logistics media "LogiShift Global".
@@ -74,13 +77,16 @@ class ArticleClassifier:
         """
         
         try:
-            response = self.gemini.client.models.generate_content(
+            response = self.gemini.generate_content(
+                prompt,
                 model='gemini-3-flash-preview',
-                contents=prompt,
                 config={
                     'response_mime_type': 'application/json'
-                }
+                },
+                method="classify_article"
             )
+            if not response:
+                raise Exception("No response from Gemini API")
             response_text = response.text
             # Clean up JSON markdown if present (though response_mime_type should handle it)
             response_text = re.sub(r'```json\n|\n```', '', response_text).strip()
@@ -118,6 +124,7 @@ class ArticleClassifier:
             return "global"
             
         # 2. Use Gemini for semantic classification (High accuracy)
+        summary = compact(summary, CLASSIFIER_SUMMARY_TOKENS)
         prompt = f"""
         You are the Editor-in-Chief of a logistics media.
         Classify the following article plan into one of the 5 article types (formats) that delivers the most value to the reader.
@@ -143,13 +150,16 @@ class ArticleClassifier:
         """
 
         try:
-            response = self.gemini.client.models.generate_content(
+            response = self.gemini.generate_content(
+                prompt,
                 model='gemini-3-flash-preview',
-                contents=prompt,
                 config={
                     'response_mime_type': 'text/plain'
-                }
+                },
+                method="classify_type"
             )
+            if not response:
+                raise Exception("No response from Gemini API")
             result = response.text.strip().lower()
             
             # Validation
@@ -1,125 +1,434 @@
 import argparse
+import contextlib
 import feedparser
 import json
-import os
-from datetime import datetime, timedelta
+import sys
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
 from dateutil import parser as date_parser
-import time
 import random
+import time
+
+try:
+    from automation.feed_cache import FeedCache, DEFAULT_CACHE_PATH, shard_cache_path
+    from automation.ledger import ArticleLedger
+    from automation.dedupe import StoryIndex
+    from automation.politeness import get_scheduler
+    from automation.source_registry import SourceRegistry, get_registry, parse_shard
+except ImportError:
+    from feed_cache import FeedCache, DEFAULT_CACHE_PATH, shard_cache_path
+    from ledger import ArticleLedger
+    from dedupe import StoryIndex
+    from politeness import get_scheduler
+    from source_registry import SourceRegistry, get_registry, parse_shard
+
+# Collection engine settings
+MAX_WORKERS = 16  # Max feeds fetched in parallel (per-host limits come from politeness.HostScheduler)
+FEED_TIMEOUT = 20  # Per-feed HTTP timeout (seconds)
+USER_AGENT = "Mozilla/5.0 (compatible; LogiShiftCollector/1.0; +https://en.logishift.net)"
+
+# Default RSS Sources (enabled feeds from sources.yaml, highest priority first)
+DEFAULT_SOURCES = get_registry().feeds()
+
+def _entry_to_dict(entry):
+    """Reduce a feedparser entry to the plain fields we use (and cache)."""
+    return {
+        "title": entry.get("title", ""),
+        "link": entry.get("link", ""),
+        "published": entry.get("published"),
+        "updated": entry.get("updated"),
+        "summary": entry.get("summary", ""),
+        "id": entry.get("id") or entry.get("link", "")
+    }
+
+def _parse_entry_date(entry):
+    """Return the entry's published (or updated) date as a datetime, or None."""
+    published_parsed = None
+    if entry.get("published"):
+         try:
+            published_parsed = date_parser.parse(entry["published"])
+         except:
+            pass
+    elif entry.get("updated"):
+         try:
+            published_parsed = date_parser.parse(entry["updated"])
+         except:
+            pass
+    return published_parsed
+
+def _is_recent(published_parsed, days=None, hours=None):
+    """Check whether an entry date falls inside the days/hours window."""
+    # Filter by date (last 24 hours) - Optional, can be a flag
+    # For now, let's just collect everything and let the scorer/filter handle it, 
+    # or maybe just last 48 hours to be safe.
+    if not published_parsed:
+        # If no date, assume it's recent enough or skip? Let's include for now.
+        return True
+
+    # Make offset-naive for comparison if needed, or handle timezones properly
+    # Simple check: if within last 2 days
+    if published_parsed.tzinfo is not None:
+        now = datetime.now(published_parsed.tzinfo)
+    else:
+        now = datetime.now()
+        
+    # Determine cutoff
+    if hours:
+        cutoff = timedelta(hours=hours)
+    elif days:
+        cutoff = timedelta(days=days)
+    else:
+        cutoff = timedelta(days=2) # Default to 2 days
+
+    return (now - published_parsed) <= cutoff
+
+def _entry_to_article(entry, source_name, published_parsed):
+    return {
+        "title": entry["title"],
+        "url": entry["link"],
+        "published": str(published_parsed) if published_parsed else "Unknown",
+        "source": source_name,
+        "summary": entry.get("summary", "")
+    }
+
+def fetch_feed_entries(url, source_name, timeout=FEED_TIMEOUT, cache=None, scheduler=None, stats=None):
+    """
+    Download and parse a feed, returning its entries as plain dicts.
 
-# Default RSS Sources
-DEFAULT_SOURCES = {
-    "techcrunch": "https://techcrunch.com/feed/",
-    "wsj_logistics": "https://feeds.a.dj.com/rss/RSSLogistics.xml",
-    "supply_chain_dive": "https://www.supplychaindive.com/feeds/news/",
-    "logistics_mgmt": "https://www.logisticsmgmt.com/rss/topic/technology",
-    "robot_report": "http://www.therobotreport.com/feed",
-    "supply_chain_brain": "https://www.supplychainbrain.com/rss/articles",
-    "freightwaves": "https://www.freightwaves.com/news/feed",
-    "robotics_automation_news": "https://roboticsandautomationnews.com/feed/",
-    "36kr_japan": "https://36kr.jp/feed/",
-    "pandaily": "https://pandaily.com/feed/",
-    "lnews": "https://www.lnews.jp/feed/",
-    "logistics_today": "https://www.logi-today.com/feed",
-    "logi_biz": "https://online.logi-biz.com/feed/",
-}
-
-def fetch_rss(url, source_name, days=None, hours=None):
-    """Fetches and parses an RSS feed."""
+    If a FeedCache is given, the request is sent with the stored ETag / Last-Modified
+    validators and a 304 response reuses the cached entries without re-parsing.
+    The request goes through the per-host scheduler (shared one by default).
+
+    If a stats dict is given it is filled with the fetch telemetry:
+    latency (seconds), bytes, entries, not_modified and error (message or None).
+    """
     print(f"Fetching {source_name} from {url}...")
-    feed = feedparser.parse(url)
-    articles = []
-    
+    if stats is None:
+        stats = {}
+    stats.update({"latency": None, "bytes": 0, "entries": 0, "not_modified": False, "error": None})
+    headers = {"User-Agent": USER_AGENT}
+    if cache is not None:
+        headers.update(cache.validators(url))
+
+    # Download with an explicit timeout (feedparser.parse(url) has none), then parse the bytes
+    started = time.monotonic()
+    try:
+        response = (scheduler or get_scheduler()).get(url, headers=headers, timeout=timeout)
+        if response.status_code != 304:
+            response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"Error fetching feed {source_name}: {e}")
+        stats["latency"] = time.monotonic() - started
+        stats["error"] = str(e)
+        return []
+
+    cached = cache.get(url) if cache is not None else None
+    if response.status_code == 304 and cached is not None:
+        print(f"  - {source_name}: not modified (304), using cached entries")
+        entries = cached.get("entries", [])
+        stats.update({"latency": time.monotonic() - started, "entries": len(entries), "not_modified": True})
+        return entries
+
+    feed = feedparser.parse(response.content)
+    stats["latency"] = time.monotonic() - started
+    stats["bytes"] = len(response.content)
+
     if feed.bozo:
         print(f"Warning: Error parsing feed {source_name}: {feed.bozo_exception}")
         # Continue anyway as feedparser often returns usable data even with errors
+        if not feed.entries:
+            stats["error"] = f"parse error: {feed.bozo_exception}"
 
-    for entry in feed.entries:
-        # Parse published date
-        published_parsed = None
-        if hasattr(entry, 'published'):
-             try:
-                published_parsed = date_parser.parse(entry.published)
-             except:
-                pass
-        elif hasattr(entry, 'updated'):
-             try:
-                published_parsed = date_parser.parse(entry.updated)
-             except:
-                pass
-        
-        # Filter by date (last 24 hours) - Optional, can be a flag
-        # For now, let's just collect everything and let the scorer/filter handle it, 
-        # or maybe just last 48 hours to be safe.
-        is_recent = False
-        if published_parsed:
-             # Make offset-naive for comparison if needed, or handle timezones properly
-             # Simple check: if within last 2 days
-             if published_parsed.tzinfo is not None:
-                 now = datetime.now(published_parsed.tzinfo)
-             else:
-                 now = datetime.now()
-                 
-             # Determine cutoff
-             if hours:
-                 cutoff = timedelta(hours=hours)
-             elif days:
-                 cutoff = timedelta(days=days)
-             else:
-                 cutoff = timedelta(days=2) # Default to 2 days
-
-             if (now - published_parsed) <= cutoff:
-                 is_recent = True
-        else:
-            # If no date, assume it's recent enough or skip? Let's include for now.
-            is_recent = True
-
-        if is_recent:
-            articles.append({
-                "title": entry.title,
-                "url": entry.link,
-                "published": str(published_parsed) if published_parsed else "Unknown",
-                "source": source_name,
-                "summary": entry.summary if hasattr(entry, 'summary') else ""
-            })
+    entries = [_entry_to_dict(entry) for entry in feed.entries]
+    stats["entries"] = len(entries)
+    if cache is not None:
+        cache.update(
+            url,
+            etag=response.headers.get("ETag"),
+            modified=response.headers.get("Last-Modified"),
+            entries=entries
+        )
+    return entries
+
+def fetch_rss(url, source_name, days=None, hours=None, timeout=FEED_TIMEOUT, cache=None, stats=None):
+    """Fetches and parses an RSS feed, keeping entries inside the days/hours window."""
+    articles = []
+    for entry in fetch_feed_entries(url, source_name, timeout=timeout, cache=cache, stats=stats):
+        published_parsed = _parse_entry_date(entry)
+        if _is_recent(published_parsed, days=days, hours=hours):
+            articles.append(_entry_to_article(entry, source_name, published_parsed))
             
     return articles
 
+def _cursor_position(published_parsed, entry_id):
+    """Comparable (UTC datetime, entry id) position of an entry."""
+    return (published_parsed.astimezone(timezone.utc), entry_id or "")
+
+def fetch_since_cursor(url, source_name, cursor=None, days=None, hours=None, timeout=FEED_TIMEOUT, cache=None, stats=None):
+    """
+    Fetch only the entries newer than a source's high-water-mark cursor.
+
+    Args:
+        cursor: {"published": ISO 8601 (UTC), "entry_id": str} from the last run, or None.
+                Without a cursor (first run) the days/hours window is used instead.
+
+    Returns:
+        (articles, new_cursor) - new_cursor is the newest (published, entry_id) seen,
+        or the old cursor if nothing newer arrived.
+    """
+    mark = None
+    if cursor and cursor.get("published"):
+        mark = (datetime.fromisoformat(cursor["published"]), cursor.get("entry_id") or "")
+
+    articles = []
+    newest = mark
+    for entry in fetch_feed_entries(url, source_name, timeout=timeout, cache=cache, stats=stats):
+        published_parsed = _parse_entry_date(entry)
+        if published_parsed is None:
+            # Undated entries cannot be ordered; keep them and let the ledger drop repeats
+            articles.append(_entry_to_article(entry, source_name, None))
+            continue
+
+        position = _cursor_position(published_parsed, entry.get("id"))
+        if mark is not None:
+            is_new = position > mark
+        else:
+            is_new = _is_recent(published_parsed, days=days, hours=hours)
+
+        if is_new:
+            articles.append(_entry_to_article(entry, source_name, published_parsed))
+        if newest is None or position > newest:
+            newest = position
+
+    new_cursor = cursor
+    if newest is not None and newest != mark:
+        new_cursor = {"published": newest[0].isoformat(), "entry_id": newest[1]}
+    return articles, new_cursor
+
+def iter_feeds(sources, days=None, hours=None, max_workers=MAX_WORKERS, timeout=FEED_TIMEOUT, cache=None, ledger=None, incremental=False, adaptive=False, poll_intervals=None):
+    """
+    Fetch and parse multiple feeds in parallel, yielding articles as each feed finishes.
+
+    Args:
+        sources: Dict of source_name -> feed URL (e.g. DEFAULT_SOURCES)
+        days / hours: Recency filter passed to fetch_rss
+        max_workers: Max number of feeds fetched concurrently
+        timeout: Per-feed HTTP timeout in seconds
+        cache: Optional FeedCache for conditional GET (saved when the stream ends)
+        ledger: Optional ArticleLedger; collected articles are recorded and already-scored ones dropped
+        incremental: Return only entries newer than each source's cursor (stored in the ledger).
+                     days/hours then only apply to sources that have no cursor yet.
+        adaptive: Skip sources whose next poll (from their feed telemetry) is not due yet.
+                  Requires incremental, so a skipped feed's entries are picked up by its cursor later.
+        poll_intervals: Optional {source: minimum hours between polls} (from the source registry),
+                        applied on top of the adaptive schedule.
+
+    With a ledger, every fetch's latency, size, entry count, new-story yield and errors
+    are recorded as feed telemetry (ArticleLedger.record_fetch).
+
+    Yields:
+        Lists of new article dicts (same shape as fetch_rss), one list per finished feed.
+        URLs are cleaned and copies of one story are merged into the first dict yielded for it,
+        whose "sources" lists every feed that carried it.
+    """
+    source_items = list(sources.items())
+    if incremental and ledger is None:
+        raise ValueError("Incremental collection requires an ArticleLedger to store cursors")
+    if adaptive and not incremental:
+        raise ValueError("Adaptive polling requires incremental collection")
+
+    if adaptive:
+        poll_intervals = poll_intervals or {}
+        due = [(name, url) for name, url in source_items
+               if ledger.is_due(name, min_interval_hours=poll_intervals.get(name))]
+        if len(due) < len(source_items):
+            print(f"Adaptive polling: {len(source_items) - len(due)} source(s) not due yet, polling {len(due)}.")
+        source_items = due
+    if not source_items:
+        return
+
+    story_index = StoryIndex()
+    workers = max(1, min(max_workers, len(source_items)))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {}
+        fetch_stats = {}
+        for name, url in source_items:
+            stats = fetch_stats[name] = {}
+            if incremental:
+                future = executor.submit(fetch_since_cursor, url, name, cursor=ledger.get_cursor(name),
+                                         days=days, hours=hours, timeout=timeout, cache=cache, stats=stats)
+            else:
+                future = executor.submit(fetch_rss, url, name, days=days, hours=hours, timeout=timeout,
+                                         cache=cache, stats=stats)
+            futures[future] = name
+
+        for future in as_completed(futures):
+            name = futures[future]
+            new_cursor = None
+            try:
+                if incremental:
+                    articles, new_cursor = future.result()
+                else:
+                    articles = future.result()
+            except Exception as e:
+                # One broken feed must not take down the whole collection run
+                print(f"Error collecting {name}: {e}")
+                articles = []
+                fetch_stats[name]["error"] = str(e)
+
+            new_records = []
+            merged_records = []
+            for article in articles:
+                record, is_new = story_index.add(article)
+                (new_records if is_new else merged_records).append(record)
+            if merged_records:
+                print(f"Dedupe: merged {len(merged_records)} {name} item(s) into stories from other sources.")
+
+            if ledger is not None:
+                new_stories = ledger.record_collected(new_records + merged_records)
+                stats = fetch_stats[name]
+                ledger.record_fetch(name, latency=stats.get("latency"), nbytes=stats.get("bytes"),
+                                    entries=stats.get("entries", 0), new_entries=new_stories, error=stats.get("error"))
+                # Advance the cursor only once the entries are safely recorded in the ledger
+                if new_cursor:
+                    ledger.set_cursor(name, new_cursor)
+                fresh = ledger.filter_unscored(new_records)
+                skipped = len(new_records) - len(fresh)
+                new_records = fresh
+            else:
+                skipped = 0
+
+            print(f"  - {name}: {len(articles)} articles, {len(new_records)} new" + (f" ({skipped} already processed)" if skipped else ""))
+            if new_records:
+                yield new_records
+    finally:
+        # Consumers may stop early (e.g. scoring early exit): drop feeds that have not started
+        executor.shutdown(wait=True, cancel_futures=True)
+        if cache is not None:
+            cache.save()
+
+def collect_feeds(sources, days=None, hours=None, max_workers=MAX_WORKERS, timeout=FEED_TIMEOUT, cache=None, ledger=None, incremental=False, adaptive=False, poll_intervals=None):
+    """
+    Fetch and parse multiple feeds in parallel and return all new articles at once.
+    See iter_feeds() for the arguments; articles are in feed completion order.
+    """
+    all_articles = []
+    for articles in iter_feeds(sources, days=days, hours=hours, max_workers=max_workers, timeout=timeout,
+                               cache=cache, ledger=ledger, incremental=incremental, adaptive=adaptive,
+                               poll_intervals=poll_intervals):
+        all_articles.extend(articles)
+    return all_articles
+
+def print_feed_stats(ledger):
+    """Print the per-source telemetry table (EWMA values)."""
+    stats = ledger.get_feed_stats()
+    if not stats:
+        print("No feed telemetry recorded yet.")
+        return
+    print(f"{'source':<26} {'fetches':>7} {'err%':>5} {'latency':>8} {'KB':>7} {'entries':>7} {'new':>5} {'every':>6}  next poll")
+    for name, s in stats.items():
+        print(f"{name:<26} {s['fetches']:>7} {(s['error_rate_ewma'] or 0) * 100:>5.0f} "
+              f"{(s['latency_ewma'] or 0):>7.2f}s {(s['bytes_ewma'] or 0) / 1024:>7.1f} "
+              f"{(s['entries_ewma'] or 0):>7.1f} {(s['new_ewma'] or 0):>5.1f} {(s['poll_interval_h'] or 0):>5.1f}h  "
+              f"{s['next_poll_at'] or '-'}")
+
 def main():
     parser = argparse.ArgumentParser(description="Collect articles from RSS feeds.")
     parser.add_argument("--source", type=str, help="Comma-separated list of source keys (e.g., techcrunch,wsj_logistics) or 'all'", default="all")
     parser.add_argument("--dry-run", action="store_true", help="Print results to stdout instead of saving (currently only prints)")
     parser.add_argument("--days", type=int, help="Filter articles published within last N days")
     parser.add_argument("--hours", type=int, help="Filter articles published within last N hours")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help=f"Max feeds fetched in parallel (default: {MAX_WORKERS})")
+    parser.add_argument("--timeout", type=int, default=FEED_TIMEOUT, help=f"Per-feed timeout in seconds (default: {FEED_TIMEOUT})")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore the ETag/Last-Modified feed cache and download every feed in full")
+    parser.add_argument("--skip-seen", action="store_true", help="Drop articles already scored according to the article ledger")
+    parser.add_argument("--incremental", action="store_true", help="Only return entries newer than each source's stored cursor (uses the article ledger)")
+    parser.add_argument("--registry", type=str, help="Source registry file (.yaml or .opml) instead of sources.yaml")
+    parser.add_argument("--shard", type=str, help="Only collect shard i of N (e.g. 0/4), by stable hash of the source name")
+    parser.add_argument("--poll-all", action="store_true", help="With --incremental, poll every source even if its adaptive poll interval has not elapsed")
+    parser.add_argument("--feed-stats", action="store_true", help="Print per-source feed telemetry from the ledger and exit")
+    parser.add_argument("--format", choices=["json", "jsonl"], default="json", help="json: one array at the end; jsonl: one article per line as each feed finishes")
+    parser.add_argument("--output", type=str, help="Write articles to this file instead of stdout")
 
     args = parser.parse_args()
 
+    if args.feed_stats:
+        print_feed_stats(ArticleLedger())
+        return
+
+    registry = SourceRegistry.load(args.registry) if args.registry else get_registry()
+    cache_path = DEFAULT_CACHE_PATH
+    if args.shard:
+        try:
+            shard_index, shard_count = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        registry = registry.shard(shard_index, shard_count)
+        cache_path = shard_cache_path(shard_index, shard_count)
+        print(f"Shard {shard_index}/{shard_count}: {len(registry.feeds())} source(s).", file=sys.stderr)
+    available_sources = registry.feeds()
+
     target_sources = {}
     if args.source == "all":
-        target_sources = DEFAULT_SOURCES
+        target_sources = available_sources
     else:
         keys = args.source.split(",")
         for key in keys:
             key = key.strip()
-            if key in DEFAULT_SOURCES:
-                target_sources[key] = DEFAULT_SOURCES[key]
+            if key in available_sources:
+                target_sources[key] = available_sources[key]
             else:
-                print(f"Warning: Source '{key}' not found in defaults.")
+                print(f"Warning: Source '{key}' not found in registry" + (" shard." if args.shard else "."))
 
-    all_articles = []
-    
-    # Shuffle sources to avoid bias (e.g. always picking up the first source's duplicate news first)
+    # Shuffle sources to avoid bias (e.g. always picking up the first source's duplicate news first),
+    # then order by priority (the sort is stable, so ties stay shuffled)
     source_items = list(target_sources.items())
     random.shuffle(source_items)
+    source_items.sort(key=lambda item: registry.sources[item[0]]["priority"], reverse=True)
 
-    for name, url in source_items:
-        articles = fetch_rss(url, name, days=args.days, hours=args.hours)
-        all_articles.extend(articles)
-        time.sleep(1) # Be nice to servers
+    stream = iter_feeds(
+        dict(source_items),
+        days=args.days,
+        hours=args.hours,
+        max_workers=args.workers,
+        timeout=args.timeout,
+        cache=None if args.no_cache else FeedCache(cache_path),
+        ledger=ArticleLedger() if (args.skip_seen or args.incremental) else None,
+        incremental=args.incremental,
+        adaptive=args.incremental and not args.poll_all,
+        poll_intervals=registry.poll_intervals()
+    )
+
+    if args.format == "jsonl":
+        # Stream one article per line as feeds finish, so scorer.py can start on the first batch.
+        # Progress messages go to stderr to keep the JSONL stream on stdout clean.
+        out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        count = 0
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                for articles in stream:
+                    for article in articles:
+                        out.write(json.dumps(article, ensure_ascii=False) + "\n")
+                    out.flush()
+                    count += len(articles)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        print(f"Found {count} articles.", file=sys.stderr)
+        return
+
+    all_articles = [article for articles in stream for article in articles]
 
     # Output results
     print(f"\nFound {len(all_articles)} articles.")
-    print(json.dumps(all_articles, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(all_articles, f, indent=2, ensure_ascii=False)
+        print(f"Saved to: {args.output}")
+    else:
+        print(json.dumps(all_articles, indent=2, ensure_ascii=False))
 
 if __name__ == "__main__":
     main()
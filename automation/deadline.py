@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Run Budget for the LogiShift Pipeline
+
+Keeps pipeline.py inside a wall-clock deadline (the GitHub Actions job
+window). Elapsed time is tracked per stage and the cost of the next unit of
+work (a scoring batch, a candidate's prep, one generate_article.py run) is
+predicted from recent latencies. Latencies are kept across runs in
+cache/stage_latencies.json, since one run only generates an article or two.
+
+When time runs short the pipeline sheds work in this order:
+1. fewer scoring batches (stop scoring early, keep time for generation)
+2. no hero image (generate_article.py --no-image)
+3. fewer articles
+"""
+
+import json
+import os
+import time
+from collections import deque
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+DEFAULT_LATENCY_PATH = os.path.join(CACHE_DIR, "stage_latencies.json")
+
+RECENT_SAMPLES = 20  # Latencies per stage used for the prediction
+SAFETY_MARGIN = 1.25  # Predictions are padded by this factor
+RESERVE_SECONDS = 60  # Kept free at the end for saving state and the job's own post steps
+
+# Used until a stage has its own history (seconds)
+DEFAULT_STAGE_SECONDS = {
+    "score_batch": 30,
+    "prepare": 60,  # Type classification + URL extraction + summarization
+    "generate": 300,  # generate_article.py with hero image
+    "generate_no_image": 220,
+}
+
+
+class RunBudget:
+    """
+    Wall-clock budget for one pipeline run.
+
+    Args:
+        deadline_minutes: Total minutes the run may take (None = unlimited)
+        reserve_seconds: Seconds kept free before the deadline
+        path: Latency history file
+    """
+
+    def __init__(self, deadline_minutes=None, reserve_seconds=RESERVE_SECONDS, path=DEFAULT_LATENCY_PATH):
+        self.started = time.monotonic()
+        self.deadline = None if deadline_minutes is None else self.started + deadline_minutes * 60
+        self.reserve = reserve_seconds
+        self.path = path
+        self.stage_elapsed = {}
+        self.shed = []  # Human-readable record of what was dropped
+        self._latencies = {}
+        self._current = None
+        self._load()
+
+    @property
+    def limited(self):
+        return self.deadline is not None
+
+    def remaining(self):
+        """Seconds left before the deadline minus the reserve (infinite if unlimited)."""
+        if self.deadline is None:
+            return float("inf")
+        return self.deadline - self.reserve - time.monotonic()
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def begin(self, name):
+        """Start timing a stage; the previous stage (if any) ends here."""
+        self._end_stage()
+        self._current = (name, time.monotonic())
+
+    def _end_stage(self):
+        if self._current is not None:
+            name, start = self._current
+            self.stage_elapsed[name] = self.stage_elapsed.get(name, 0.0) + time.monotonic() - start
+            self._current = None
+
+    def record(self, name, seconds):
+        """Add one latency sample for a unit of work."""
+        self._latencies.setdefault(name, deque(maxlen=RECENT_SAMPLES)).append(seconds)
+
+    def estimate(self, name):
+        """Predicted seconds for one unit of the stage: padded recent mean, or the default."""
+        samples = self._latencies.get(name)
+        if not samples:
+            return DEFAULT_STAGE_SECONDS.get(name, 0)
+        return sum(samples) / len(samples) * SAFETY_MARGIN
+
+    def can_afford(self, name, count=1, keep=0.0):
+        """True if count units of the stage fit in the remaining time with `keep` seconds left over."""
+        return self.estimate(name) * count + keep <= self.remaining()
+
+    def note_shed(self, message):
+        self.shed.append(message)
+        print(f"Deadline: {message} ({max(0, self.remaining()):.0f}s left before reserve).")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Warning: Failed to load stage latencies ({e}).")
+            return
+        for name, samples in data.items():
+            self._latencies[name] = deque(samples[-RECENT_SAMPLES:], maxlen=RECENT_SAMPLES)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({name: list(samples) for name, samples in self._latencies.items()}, f)
+        os.replace(tmp_path, self.path)
+
+    def report(self):
+        self._end_stage()
+        stages = ", ".join(f"{name} {seconds:.0f}s" for name, seconds in self.stage_elapsed.items())
+        limit = f" of {(self.deadline - self.started) / 60:.0f} min" if self.limited else ""
+        print(f"Run time: {self.elapsed():.0f}s{limit} ({stages or 'no stages timed'}).")
+        for message in self.shed:
+            print(f"  Shed: {message}")
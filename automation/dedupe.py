@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Cross-Source Story Deduplication for LogiShift Collector
+
+The same press release is often carried by several feeds with different
+tracking parameters or redirect wrappers. StoryIndex canonicalizes each
+collected article and merges copies of one story (same canonical URL or
+same headline) into a single record that lists every source, so the story
+is scored once.
+"""
+
+try:
+    from automation.url_utils import canonicalize_url, clean_url, title_hash
+except ImportError:
+    from url_utils import canonicalize_url, clean_url, title_hash
+
+
+class StoryIndex:
+    """In-memory hash index of collected stories (canonical URL + headline hash)."""
+
+    def __init__(self):
+        self._by_url = {}
+        self._by_title = {}
+        self.records = []
+        self.merged_count = 0
+
+    def add(self, article):
+        """
+        Canonicalize and index an article.
+
+        Returns:
+            (record, is_new) - record is the merged story dict (with a "sources" list);
+            is_new is False when the article was folded into an existing story.
+        """
+        canonical = canonicalize_url(article.get("url", ""))
+        t_hash = title_hash(article.get("title", ""))
+
+        record = self._by_url.get(canonical) if canonical else None
+        if record is None and t_hash:
+            record = self._by_title.get(t_hash)
+
+        if record is not None:
+            source = article.get("source")
+            if source and source not in record["sources"]:
+                record["sources"].append(source)
+            self._index(record, canonical, t_hash)
+            self.merged_count += 1
+            return record, False
+
+        record = dict(article)
+        record["url"] = clean_url(article.get("url", ""))
+        record["sources"] = [article.get("source")] if article.get("source") else []
+        self._index(record, canonical, t_hash)
+        self.records.append(record)
+        return record, True
+
+    def _index(self, record, canonical, t_hash):
+        if canonical:
+            self._by_url.setdefault(canonical, record)
+        if t_hash:
+            self._by_title.setdefault(t_hash, record)
+
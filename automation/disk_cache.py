@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Persistent Key/Value Cache for LogiShift
+
+Small SQLite-backed cache with a TTL and LRU eviction, for results that are
+expensive to recompute (LLM scores, responses). Values are stored as JSON.
+Safe to share between threads; several namespaces can live in one file.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+DEFAULT_CACHE_PATH = os.path.join(CACHE_DIR, "disk_cache.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace   TEXT NOT NULL,
+    key         TEXT NOT NULL,
+    value       TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (namespace, accessed_at);
+"""
+
+
+def make_key(*parts):
+    """Stable hash key of any JSON-serializable parts."""
+    blob = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    TTL + LRU cache in one SQLite namespace.
+
+    Args:
+        namespace: Logical cache name (e.g. "scores")
+        ttl: Seconds an entry stays valid (None = no expiry)
+        max_entries: Entries kept in the namespace; least recently used are evicted beyond it
+        path: SQLite file
+    """
+
+    def __init__(self, namespace, ttl=None, max_entries=10000, path=DEFAULT_CACHE_PATH):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.executescript(SCHEMA)
+        # Expired rows are otherwise only dropped when read again
+        self.purge_expired()
+
+    def get(self, key):
+        """Return the cached value, or None on a miss / expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+            ).fetchone()
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                if row is not None:
+                    self.conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                self.misses += 1
+                return None
+            self.conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?", (now, self.namespace, key)
+            )
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        """Store a JSON-serializable value, evicting the least recently used entries if over capacity."""
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            count = self.conn.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+            if count > self.max_entries:
+                # Evict down to 90% of capacity so we do not pay for eviction on every insert
+                excess = count - int(self.max_entries * 0.9)
+                self.conn.execute(
+                    """DELETE FROM cache WHERE namespace = ? AND key IN (
+                           SELECT key FROM cache WHERE namespace = ? ORDER BY accessed_at LIMIT ?)""",
+                    (self.namespace, self.namespace, excess)
+                )
+
+    def purge_expired(self):
+        """Delete expired entries. Returns the number removed."""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND created_at < ?", (self.namespace, time.time() - self.ttl)
+            )
+        return cursor.rowcount
+
+    def stats(self):
+        """Return {"hits", "misses", "entries"} for this namespace."""
+        with self._lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+HTTP Feed Cache for LogiShift Collector
+
+Persists per-feed HTTP validators (ETag / Last-Modified) and the last parsed
+entries, so unchanged feeds can be answered with a 304 instead of being
+downloaded and re-parsed on every run.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+DEFAULT_CACHE_PATH = os.path.join(CACHE_DIR, "feed_cache.json")
+
+
+def shard_cache_path(shard_index, shard_count):
+    """
+    Cache file for one collector shard.
+
+    Shards run as separate processes and each saves its whole cache, so they
+    must not share a file; a shard only ever fetches its own feeds.
+    """
+    return os.path.join(CACHE_DIR, f"feed_cache.shard-{shard_index}-of-{shard_count}.json")
+
+
+class FeedCache:
+    """
+    JSON-backed cache keyed by feed URL.
+
+    Each record looks like:
+        {
+            "etag": "...",
+            "modified": "...",
+            "entries": [{"title": ..., "link": ..., "published": ..., "updated": ..., "summary": ..., "id": ...}],
+            "fetched_at": "ISO 8601"
+        }
+
+    Safe to share between collector threads; call save() once after collection.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = {}
+        self._dirty = False
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+            except Exception as e:
+                print(f"Warning: Failed to load feed cache ({e}). Starting empty.")
+                self._data = {}
+
+    def get(self, url):
+        """Return the cached record for a feed URL, or None."""
+        with self._lock:
+            return self._data.get(url)
+
+    def validators(self, url):
+        """Return conditional-GET request headers for a feed URL."""
+        record = self.get(url)
+        headers = {}
+        if record:
+            if record.get("etag"):
+                headers["If-None-Match"] = record["etag"]
+            if record.get("modified"):
+                headers["If-Modified-Since"] = record["modified"]
+        return headers
+
+    def update(self, url, etag, modified, entries):
+        """Store fresh validators and parsed entries for a feed URL."""
+        with self._lock:
+            self._data[url] = {
+                "etag": etag,
+                "modified": modified,
+                "entries": entries,
+                "fetched_at": datetime.now().isoformat()
+            }
+            self._dirty = True
+
+    def save(self):
+        """Write the cache to disk (atomic replace). No-op if nothing changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
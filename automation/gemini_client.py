@@ -4,20 +4,90 @@ import base64
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
+import asyncio
+import threading
 import time
 import random
 import textwrap
 import re
 
+try:
+    from automation.disk_cache import DiskCache, make_key
+    from automation.rate_limiter import get_rate_limiter, estimate_request_tokens, usage_tokens
+except ImportError:
+    from disk_cache import DiskCache, make_key
+    from rate_limiter import get_rate_limiter, estimate_request_tokens, usage_tokens
+
 load_dotenv(override=True)
 
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 2  # seconds, doubled per attempt
+RESPONSE_CACHE_TTL = 3 * 24 * 3600  # Seconds a cached response stays valid
+RESPONSE_CACHE_MAX_ENTRIES = 5000
+# Methods whose text responses can be cached (images are never cached)
+CACHEABLE_METHODS = (
+    "generate_content", "generate_article", "generate_image_prompt", "classify_content",
+    "generate_static_page", "generate_structured_summary", "generate_sns_content", "check_duplication",
+    "classify_article", "classify_type",
+)
+
+
+class CachedResponse:
+    """Stand-in for a genai response served from the response cache (only .text is kept)."""
+
+    def __init__(self, text):
+        self.text = text
+
+
+def _cache_methods_from_env():
+    """GEMINI_RESPONSE_CACHE: unset/0 = off, 1/all = every cacheable method, or a comma-separated method list."""
+    value = os.getenv("GEMINI_RESPONSE_CACHE", "").strip().lower()
+    if value in ("", "0", "false", "off"):
+        return set()
+    if value in ("1", "true", "on", "all"):
+        return set(CACHEABLE_METHODS)
+    return {m.strip() for m in value.split(",") if m.strip()}
+
+
+def _is_quota_error(error):
+    error_str = str(error).lower()
+    return "429" in error_str or "quota" in error_str or "exhausted" in error_str
+
+
+def _retry_delay(attempt):
+    return (RETRY_BASE_DELAY * (2 ** attempt)) + (random.random() * 1)
+
+
+def _config_fingerprint(config):
+    """JSON-able view of a request config (dict or GenerateContentConfig) for the cache key."""
+    if config is None:
+        return None
+    if hasattr(config, "model_dump"):
+        return config.model_dump(exclude_none=True, mode="json")
+    return config
+
+
 class GeminiClient:
-    def __init__(self):
+    def __init__(self, cache_methods=None):
+        """
+        Args:
+            cache_methods: Methods whose responses are served from / stored in the disk
+                response cache (see CACHEABLE_METHODS). None reads GEMINI_RESPONSE_CACHE;
+                caching is off unless enabled.
+        """
         self.project_id = os.getenv("GOOGLE_CLOUD_PROJECT")
         self.location = os.getenv("GOOGLE_CLOUD_LOCATION")
         self.api_key = os.getenv("GEMINI_API_KEY")
         self.client = None
         self.use_vertex = False
+        self._image_client = None
+        self._lock = threading.Lock()  # Guards client swaps (Vertex fallback) and the lazy image client
+        self._response_cache = None
+        self.cache_methods = set()
+        self.cache_hits = {}  # method -> hits (misses are counted in cache_misses)
+        self.cache_misses = {}
+        self.rate_limiter = get_rate_limiter()  # Shared RPM/TPM buckets (None if GEMINI_RATE_LIMITS=off)
+        self.enable_response_cache(_cache_methods_from_env() if cache_methods is None else cache_methods)
 
         # Prioritize Vertex AI initialization
         if self.project_id and self.location:
@@ -40,23 +110,36 @@ class GeminiClient:
     def _retry_request(self, func, *args, **kwargs):
         """
         Retry a function call with exponential backoff if a quota error occurs.
+
+        Calls with a model= keyword are metered by the shared rate limiter first
+        (one request + estimated tokens), so concurrent callers queue for quota
+        instead of all running into 429s.
         """
-        max_retries = 5
-        base_delay = 2  # seconds
+        max_retries = RETRY_MAX_ATTEMPTS
+        model = kwargs.get("model")
+        limiter = self.rate_limiter if model else None
+        estimated = estimate_request_tokens(kwargs.get("contents", kwargs.get("prompt"))) if limiter else 0
         
         for attempt in range(max_retries):
             try:
-                return func(*args, **kwargs)
+                if limiter is not None:
+                    limiter.acquire(model, estimated)
+                response = func(*args, **kwargs)
+                if limiter is not None:
+                    limiter.settle(model, estimated, usage_tokens(response))
+                return response
             except Exception as e:
-                error_str = str(e).lower()
                 # Check for rate limit/quota errors
-                if "429" in error_str or "quota" in error_str or "exhausted" in error_str:
+                if _is_quota_error(e):
                     if attempt == max_retries - 1:
                         print(f"Max retries ({max_retries}) exceeded for quota error.")
                         raise e
                     
-                    delay = (base_delay * (2 ** attempt)) + (random.random() * 1)
+                    delay = _retry_delay(attempt)
                     print(f"Quota exceeded (429). Retrying in {delay:.2f}s... (Attempt {attempt + 1}/{max_retries})")
+                    if limiter is not None:
+                        # Pause every caller of this model, not just this one, to avoid a retry storm
+                        limiter.back_off(model, delay)
                     time.sleep(delay)
                 else:
                     # Not a quota error, raise immediately
@@ -95,46 +178,156 @@ class GeminiClient:
             
         return "\n".join(new_lines)
 
-    def generate_content(self, prompt, model='gemini-3-pro-preview', config=None):
+    def enable_response_cache(self, methods=CACHEABLE_METHODS):
+        """Serve the given methods' responses from the disk cache (an empty set turns caching off)."""
+        self.cache_methods = set(methods)
+        unknown = self.cache_methods - set(CACHEABLE_METHODS)
+        if unknown:
+            print(f"Warning: Ignoring unknown response cache method(s): {', '.join(sorted(unknown))}")
+            self.cache_methods -= unknown
+        if self.cache_methods and self._response_cache is None:
+            self._response_cache = DiskCache("gemini_responses", ttl=RESPONSE_CACHE_TTL,
+                                             max_entries=RESPONSE_CACHE_MAX_ENTRIES)
+
+    def response_cache_stats(self):
+        """Return {"hits", "misses", "entries", "by_method"} for the response cache (None if disabled)."""
+        if self._response_cache is None:
+            return None
+        stats = self._response_cache.stats()
+        stats["hits"] = sum(self.cache_hits.values())
+        stats["misses"] = sum(self.cache_misses.values())
+        stats["by_method"] = {m: {"hits": self.cache_hits.get(m, 0), "misses": self.cache_misses.get(m, 0)}
+                              for m in sorted(set(self.cache_hits) | set(self.cache_misses))}
+        return stats
+
+    def _call_model(self, model, contents, config):
+        """models.generate_content with quota retries; switches to the API key once if Vertex auth expires."""
+        try:
+            return self._retry_request(self.client.models.generate_content, model=model, contents=contents, config=config)
+        except Exception as e:
+            if not self._fall_back_to_api_key(e):
+                raise
+            return self._retry_request(self.client.models.generate_content, model=model, contents=contents, config=config)
+
+    def _fall_back_to_api_key(self, error):
+        """Switch from Vertex AI to the API key after an auth expiry. Returns True if the call should be retried."""
+        if "Reauthentication is needed" not in str(error) or not self.api_key:
+            return False
+        # Shared client: several threads may hit the auth error at once, switch only once
+        with self._lock:
+            if self.use_vertex:
+                print(f"Vertex AI Auth failed ({error}). Switching to API Key...")
+                self.client = genai.Client(api_key=self.api_key, vertexai=False)
+                self.use_vertex = False
+        return True
+
+    def _generate(self, method, model, contents, config=None):
+        """
+        Single entry point for text generation calls.
+
+        If `method` has the response cache enabled, a response for the same model,
+        prompt and config is returned from disk (as a CachedResponse) without calling
+        Gemini; fresh non-empty responses are stored. Raises on API errors.
+        """
+        key, cached = self._cache_lookup(method, model, contents, config)
+        if cached is not None:
+            return cached
+        response = self._call_model(model, contents, config)
+        self._cache_store(key, response)
+        return response
+
+    def _cache_lookup(self, method, model, contents, config):
+        """Returns (key, CachedResponse or None); key is None if the method is not cached."""
+        if method not in self.cache_methods:
+            return None, None
+        key = make_key(model, contents, _config_fingerprint(config))
+        cached = self._response_cache.get(key)
+        if cached is not None:
+            self.cache_hits[method] = self.cache_hits.get(method, 0) + 1
+            return key, CachedResponse(cached["text"])
+        self.cache_misses[method] = self.cache_misses.get(method, 0) + 1
+        return key, None
+
+    def _cache_store(self, key, response):
+        if key is None:
+            return
+        try:
+            text = response.text
+        except Exception:
+            text = None  # Blocked / non-text responses are not cached
+        if text:
+            self._response_cache.set(key, {"text": text})
+
+    def generate_content(self, prompt, model='gemini-3-pro-preview', config=None, method="generate_content"):
         """
         Generic method to generate content with retry logic.
+
+        method names the caller for the response cache (e.g. "check_duplication").
         """
         try:
-            response = self._retry_request(
-                self.client.models.generate_content,
-                model=model,
-                contents=prompt,
-                config=config
-            )
-            return response
+            return self._generate(method, model, prompt, config)
         except Exception as e:
-            # Fallback for Vertex AI Auth errors
-            if self.use_vertex and "Reauthentication is needed" in str(e):
-                print(f"Vertex AI Auth failed ({e}). Switching to API Key...")
-                try:
-                    self.use_vertex = False
-                    self.client = genai.Client(api_key=self.api_key, vertexai=False)
-                    # Retry with new client
-                    response = self._retry_request(
-                        self.client.models.generate_content,
-                        model=model,
-                        contents=prompt,
-                        config=config
-                    )
-                    return response
-                except Exception as fallback_e:
-                    print(f"Fallback to API Key failed: {fallback_e}")
-                    return None
+            print(f"Error generating content: {e}")
+            return None
+
+    # --- Async API (client.aio): same retry, rate limiting, fallback and caching as the sync methods ---
+
+    async def _aretry_request(self, func, *args, **kwargs):
+        """Async _retry_request(): waits for quota and backs off with asyncio.sleep instead of blocking."""
+        max_retries = RETRY_MAX_ATTEMPTS
+        model = kwargs.get("model")
+        limiter = self.rate_limiter if model else None
+        estimated = estimate_request_tokens(kwargs.get("contents", kwargs.get("prompt"))) if limiter else 0
+
+        for attempt in range(max_retries):
+            try:
+                if limiter is not None:
+                    await asyncio.sleep(limiter.reserve(model, estimated))
+                response = await func(*args, **kwargs)
+                if limiter is not None:
+                    limiter.settle(model, estimated, usage_tokens(response))
+                return response
+            except Exception as e:
+                if not _is_quota_error(e):
+                    raise
+                if attempt == max_retries - 1:
+                    print(f"Max retries ({max_retries}) exceeded for quota error.")
+                    raise
+                delay = _retry_delay(attempt)
+                print(f"Quota exceeded (429). Retrying in {delay:.2f}s... (Attempt {attempt + 1}/{max_retries})")
+                if limiter is not None:
+                    limiter.back_off(model, delay)
+                await asyncio.sleep(delay)
 
+    async def _acall_model(self, model, contents, config):
+        try:
+            return await self._aretry_request(self.client.aio.models.generate_content,
+                                              model=model, contents=contents, config=config)
+        except Exception as e:
+            if not self._fall_back_to_api_key(e):
+                raise
+            return await self._aretry_request(self.client.aio.models.generate_content,
+                                              model=model, contents=contents, config=config)
+
+    async def _agenerate(self, method, model, contents, config=None):
+        """Async _generate()."""
+        key, cached = self._cache_lookup(method, model, contents, config)
+        if cached is not None:
+            return cached
+        response = await self._acall_model(model, contents, config)
+        self._cache_store(key, response)
+        return response
+
+    async def agenerate_content(self, prompt, model='gemini-3-pro-preview', config=None, method="generate_content"):
+        """Async version of generate_content()."""
+        try:
+            return await self._agenerate(method, model, prompt, config)
+        except Exception as e:
             print(f"Error generating content: {e}")
             return None
 
-    def generate_article(self, keyword, article_type="know", context=None, extra_instructions=None):
-        """
-        Generate a full blog article in Markdown format based on the keyword and type.
-        """
-        print(f"Generating article for keyword: {keyword} (Type: {article_type})")
-        
+    def _generate_article_prompt(self, keyword, article_type, context, extra_instructions):
+        """Prompt for generate_article() / agenerate_article()."""
         context_section = ""
         if context:
             context_section = f"""
@@ -443,10 +636,18 @@ class GeminiClient:
         
         ...
         """)
-        
+        return prompt
+
+    def generate_article(self, keyword, article_type="know", context=None, extra_instructions=None):
+        """
+        Generate a full blog article in Markdown format based on the keyword and type.
+        """
+        print(f"Generating article for keyword: {keyword} (Type: {article_type})")
+        prompt = self._generate_article_prompt(keyword, article_type, context, extra_instructions)
+
         try:
-            response = self._retry_request(
-                self.client.models.generate_content,
+            response = self._generate(
+                "generate_article",
                 model='gemini-3-pro-preview',
                 contents=prompt
             )
@@ -455,6 +656,33 @@ class GeminiClient:
             print(f"Error generating content: {e}")
             return None
 
+    async def agenerate_article(self, keyword, article_type="know", context=None, extra_instructions=None):
+        """Async version of generate_article()."""
+        print(f"Generating article for keyword: {keyword} (Type: {article_type})")
+        prompt = self._generate_article_prompt(keyword, article_type, context, extra_instructions)
+
+        try:
+            response = await self._agenerate(
+                "generate_article",
+                model='gemini-3-pro-preview',
+                contents=prompt
+            )
+            return self._sanitize_markdown(response.text)
+        except Exception as e:
+            print(f"Error generating content: {e}")
+            return None
+
+    def _get_image_client(self):
+        """
+        Dedicated google-genai client on the v1beta API (API Key support and aspect
+        ratio control for Gemini 2.5 Flash Image), created once per GeminiClient.
+        """
+        with self._lock:
+            if self._image_client is None:
+                self._image_client = genai.Client(api_key=self.api_key, vertexai=False,
+                                                  http_options={'api_version': 'v1beta'})
+            return self._image_client
+
     def generate_image(self, prompt, output_path, aspect_ratio="16:9"):
         """
         Generate an image using Gemini 2.5 Flash Image (Primary) or Imagen 3.0 (Fallback).
@@ -463,11 +691,7 @@ class GeminiClient:
         try:
             print(f"Generating image with Gemini 2.5 Flash Image for prompt: {prompt}")
             
-            # Use google-genai SDK (v1beta) for API Key support and aspect ratio control
-            # We need a dedicated client for v1beta to ensure aspect_ratio works
-            client_v1beta = genai.Client(api_key=self.api_key, vertexai=False, http_options={'api_version': 'v1beta'})
-            
-            response = client_v1beta.models.generate_content(
+            response = self._get_image_client().models.generate_content(
                 model='gemini-2.5-flash-image',
                 contents=prompt,
                 config=types.GenerateContentConfig(
@@ -554,8 +778,8 @@ class GeminiClient:
         """)
         
         try:
-            response = self._retry_request(
-                self.client.models.generate_content,
+            response = self._generate(
+                "generate_image_prompt",
                 model='gemini-3-pro-preview',
                 contents=prompt
             )
@@ -565,11 +789,9 @@ class GeminiClient:
             # Fallback to simple prompt
             return f"Professional logistics warehouse scene related to {title}, photorealistic, high quality, 4k"
 
-    def classify_content(self, content):
-        """
-        Classify the article content into categories and tags.
-        """
-        prompt = textwrap.dedent(f"""
+    def _classify_content_prompt(self, content):
+        """Prompt for classify_content() / aclassify_content()."""
+        return textwrap.dedent(f"""
         You are an expert content classifier for a logistics media site.
         Analyze the following article content and classify it.
 
@@ -583,10 +805,37 @@ class GeminiClient:
             "theme_tags": ["list", "of", "relevant", "themes", "e.g.", "labor-shortage", "automation", "cost-reduction", "quality-improvement", "safety", "environment"]
         }}
         """)
-        
+
+    def classify_content(self, content):
+        """
+        Classify the article content into categories and tags.
+        """
+        prompt = self._classify_content_prompt(content)
+
         try:
-            response = self._retry_request(
-                self.client.models.generate_content,
+            response = self._generate(
+                "classify_content",
+                model='gemini-3-pro-preview',
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    response_mime_type="application/json"
+                )
+            )
+            import json
+            return json.loads(response.text)
+        except Exception as e:
+            print(f"Classification failed: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+    async def aclassify_content(self, content):
+        """Async version of classify_content()."""
+        prompt = self._classify_content_prompt(content)
+
+        try:
+            response = await self._agenerate(
+                "classify_content",
                 model='gemini-3-pro-preview',
                 contents=prompt,
                 config=types.GenerateContentConfig(
@@ -715,13 +964,11 @@ class GeminiClient:
         if not prompt:
             return None
 
-        return self.generate_content(prompt, model='gemini-3-pro-preview')
+        return self.generate_content(prompt, model='gemini-3-pro-preview', method="generate_static_page")
 
-    def generate_structured_summary(self, content):
-        """
-        Generate a structured JSON summary of the article for internal linking relevance.
-        """
-        prompt = textwrap.dedent(f"""
+    def _generate_structured_summary_prompt(self, content):
+        """Prompt for generate_structured_summary() / agenerate_structured_summary()."""
+        return textwrap.dedent(f"""
         You are an expert content analyst. Analyze the following article and generate a structured summary in JSON format.
         This summary will be used by an AI system to identify relevant internal links.
         
@@ -735,10 +982,16 @@ class GeminiClient:
             "entities": ["list", "of", "companies", "products", "or", "tools", "mentioned"]
         }}
         """)
-        
+
+    def generate_structured_summary(self, content):
+        """
+        Generate a structured JSON summary of the article for internal linking relevance.
+        """
+        prompt = self._generate_structured_summary_prompt(content)
+
         try:
-            response = self._retry_request(
-                self.client.models.generate_content,
+            response = self._generate(
+                "generate_structured_summary",
                 model='gemini-3-pro-preview',
                 contents=prompt,
                 config=types.GenerateContentConfig(
@@ -751,11 +1004,27 @@ class GeminiClient:
             print(f"Structured summary generation failed: {e}")
             return None
 
-    def generate_sns_content(self, title, content, article_type="know"):
-        """
-        Generate engaging SNS (Twitter/X) post content.
-        Output is JSON: {"hook": "...", "summary": "...", "hashtags": ["#tag1", ...]}
-        """
+    async def agenerate_structured_summary(self, content):
+        """Async version of generate_structured_summary()."""
+        prompt = self._generate_structured_summary_prompt(content)
+
+        try:
+            response = await self._agenerate(
+                "generate_structured_summary",
+                model='gemini-3-pro-preview',
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    response_mime_type="application/json"
+                )
+            )
+            import json
+            return json.loads(response.text)
+        except Exception as e:
+            print(f"Structured summary generation failed: {e}")
+            return None
+
+    def _generate_sns_content_prompt(self, title, content, article_type):
+        """Prompt for generate_sns_content() / agenerate_sns_content()."""
         # Truncate content for efficiency
         truncated_content = content[:3000]
         
@@ -794,10 +1063,18 @@ class GeminiClient:
             "hashtags": ["#SupplyChain", "#Logistics", "#WMS", "#WarehouseAutomation", "#DigitalTransformation"]
         }}
         """)
-        
+        return prompt
+
+    def generate_sns_content(self, title, content, article_type="know"):
+        """
+        Generate engaging SNS (Twitter/X) post content.
+        Output is JSON: {"hook": "...", "summary": "...", "hashtags": ["#tag1", ...]}
+        """
+        prompt = self._generate_sns_content_prompt(title, content, article_type)
+
         try:
-            response = self._retry_request(
-                self.client.models.generate_content,
+            response = self._generate(
+                "generate_sns_content",
                 model='gemini-3-flash-preview',
                 contents=prompt,
                 config=types.GenerateContentConfig(
@@ -815,14 +1092,32 @@ class GeminiClient:
                 "hashtags": ["#LogiShift", "#Logistics"]
             }
 
-    def check_duplication(self, new_title, new_summary, existing_titles):
-        """
-        Check if the new article is a duplicate of any existing articles using Gemini.
-        Returns: True if duplicate, False otherwise.
-        """
-        if not existing_titles:
-            return False
+    async def agenerate_sns_content(self, title, content, article_type="know"):
+        """Async version of generate_sns_content()."""
+        prompt = self._generate_sns_content_prompt(title, content, article_type)
+
+        try:
+            response = await self._agenerate(
+                "generate_sns_content",
+                model='gemini-3-flash-preview',
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    response_mime_type="application/json"
+                )
+            )
+            import json
+            return json.loads(response.text)
+        except Exception as e:
+            print(f"SNS content generation failed: {e}")
+            # Fallback
+            return {
+                "hook": f"【New Post】{title}",
+                "summary": "Check out our latest logistics insights here!",
+                "hashtags": ["#LogiShift", "#Logistics"]
+            }
 
+    def _check_duplication_prompt(self, new_title, new_summary, existing_titles):
+        """Prompt for check_duplication() / acheck_duplication()."""
         # Prepare the list of existing titles for the prompt
         existing_list_str = "\n".join([f"- {title}" for title in existing_titles])
 
@@ -843,10 +1138,40 @@ class GeminiClient:
         - Be strict. If it's the same press release covered by a different site, it IS a duplicate.
         - Output ONLY "TRUE" or "FALSE".
         """)
-        
+        return prompt
+
+    def check_duplication(self, new_title, new_summary, existing_titles):
+        """
+        Check if the new article is a duplicate of any existing articles using Gemini.
+        Returns: True if duplicate, False otherwise.
+        """
+        if not existing_titles:
+            return False
+        prompt = self._check_duplication_prompt(new_title, new_summary, existing_titles)
+
         try:
             # Use self.generate_content to leverage built-in retry and auth fallback logic
-            response = self.generate_content(prompt, model='gemini-2.0-flash-exp') # Use Flash for speed/cost
+            response = self.generate_content(prompt, model='gemini-2.0-flash-exp', method="check_duplication") # Use Flash for speed/cost
+            
+            if response and response.text:
+                result = response.text.strip().upper()
+                print(f"Duplication Check: {result} (Article: {new_title})")
+                return "TRUE" in result
+            return False
+        except Exception as e:
+            print(f"Error checking duplication: {e}")
+            # If check fails, assume NOT duplicate to avoid blocking valid content (fail open)
+            return False
+
+    async def acheck_duplication(self, new_title, new_summary, existing_titles):
+        """Async version of check_duplication()."""
+        if not existing_titles:
+            return False
+        prompt = self._check_duplication_prompt(new_title, new_summary, existing_titles)
+
+        try:
+            # Use self.agenerate_content to leverage built-in retry and auth fallback logic
+            response = await self.agenerate_content(prompt, model='gemini-2.0-flash-exp', method="check_duplication") # Use Flash for speed/cost
             
             if response and response.text:
                 result = response.text.strip().upper()
@@ -858,6 +1183,28 @@ class GeminiClient:
             # If check fails, assume NOT duplicate to avoid blocking valid content (fail open)
             return False
 
+
+_shared_client = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_client():
+    """
+    Process-wide GeminiClient.
+
+    Components take their client from here (or an explicit client argument)
+    instead of constructing their own, so credentials, auth and the HTTP
+    transport are set up once per process. Safe to call from several threads;
+    raises like GeminiClient() if no credentials are configured.
+    """
+    global _shared_client
+    if _shared_client is None:
+        with _shared_lock:
+            if _shared_client is None:
+                _shared_client = GeminiClient()
+    return _shared_client
+
+
 if __name__ == "__main__":
     # Test generation
     try:
@@ -865,3 +1212,4 @@ if __name__ == "__main__":
         print("GeminiClient initialized successfully.")
     except Exception as e:
         print(f"Initialization failed: {e}")
+
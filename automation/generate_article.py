@@ -5,13 +5,13 @@ import json
 import markdown
 from datetime import datetime
 try:
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_shared_client
     from automation.wp_client import WordPressClient
     from automation.classifier import ArticleClassifier
     from automation.internal_linker import InternalLinkSuggester
 except ImportError:
     import gemini_client
-    from gemini_client import GeminiClient
+    from gemini_client import get_shared_client
     from wp_client import WordPressClient
     from classifier import ArticleClassifier
     from internal_linker import InternalLinkSuggester
@@ -87,6 +87,11 @@ keyword: {keyword}
     except Exception as e:
         print(f"Warning: Failed to save local file: {e}")
 
+def print_response_cache_stats(gemini):
+    stats = gemini.response_cache_stats()
+    if stats:
+        print(f"Response cache: {stats['hits']} hit(s), {stats['misses']} miss(es), {stats['entries']} entries")
+
 def main():
     parser = argparse.ArgumentParser(description="Generate and post an article to WordPress.")
     parser.add_argument('--keyword', type=str, required=True, help='Keyword for the article')
@@ -94,6 +99,9 @@ def main():
     parser.add_argument('--dry-run', action='store_true', help='Generate content but do not post to WordPress')
     parser.add_argument('--schedule', type=str, help='Schedule date (YYYY-MM-DD HH:MM or YYYY-MM-DD HH:MM:SS)')
     parser.add_argument('--context', type=str, help='Article context for News/Global articles (JSON string, optional)')
+    parser.add_argument('--source-url', type=str, help='Source article URL; marks it as generated in the article ledger once posted')
+    parser.add_argument('--no-image', action='store_true', help='Skip hero image generation (used by pipeline.py when short on time)')
+    parser.add_argument('--response-cache', action='store_true', help='Reuse cached Gemini responses for identical prompts (fast dry-run iterations; also GEMINI_RESPONSE_CACHE=1)')
     
     args = parser.parse_args()
     
@@ -108,7 +116,9 @@ def main():
     # 1. Initialize Clients
     wp_client = None
     try:
-        gemini = GeminiClient()
+        gemini = get_shared_client()
+        if args.response_cache:
+            gemini.enable_response_cache()
         # Initialize WP client for reading (linking) even in dry-run
         try:
             from wp_client import WordPressClient # Ensure class is available if not imported top-level
@@ -240,7 +250,7 @@ Select the most relevant ones (if any) and include them in the article using sta
         except ImportError:
             from automation.seo_optimizer import SEOOptimizer
             
-        optimizer = SEOOptimizer()
+        optimizer = SEOOptimizer(gemini)
         
         # Generate Meta Description
         meta_desc = optimizer.generate_meta_description(title, content, args.keyword)
@@ -256,26 +266,30 @@ Select the most relevant ones (if any) and include them in the article using sta
 
     # 2.5 Generate Hero Image
     # if gemini.use_vertex: # Allow for both Vertex and API Key
-    print("Generating hero image...")
+    if args.no_image:
+        print("Skipping hero image (--no-image).")
+        generated_image_path = None
+    else:
+        print("Generating hero image...")
     
-    # Generate contextual image prompt based on article content
-    content_summary = content[:1000]  # Use first 1000 chars as summary
-    image_prompt = gemini.generate_image_prompt(title, content_summary, args.type)
-    print(f"Image prompt: {image_prompt}")
+        # Generate contextual image prompt based on article content
+        content_summary = content[:1000]  # Use first 1000 chars as summary
+        image_prompt = gemini.generate_image_prompt(title, content_summary, args.type)
+        print(f"Image prompt: {image_prompt}")
     
-    import os
-    output_dir = os.path.join(os.path.dirname(__file__), "generated_articles")
-    date_str = datetime.now().strftime("%Y-%m-%d")
-    safe_keyword = re.sub(r'[\\/*?:"\<\>| ]', '_', args.keyword)
-    image_filename = f"{date_str}_{safe_keyword}_hero.png"
-    image_path = os.path.join(output_dir, image_filename)
+        import os
+        output_dir = os.path.join(os.path.dirname(__file__), "generated_articles")
+        date_str = datetime.now().strftime("%Y-%m-%d")
+        safe_keyword = re.sub(r'[\\/*?:"\<\>| ]', '_', args.keyword)
+        image_filename = f"{date_str}_{safe_keyword}_hero.png"
+        image_path = os.path.join(output_dir, image_filename)
     
-    generated_image_path = gemini.generate_image(image_prompt, image_path, aspect_ratio="16:9")
+        generated_image_path = gemini.generate_image(image_prompt, image_path, aspect_ratio="16:9")
     
-    if generated_image_path:
-        # Re-save the file (without inserting image into content)
-        save_to_file(title, content, args.keyword)
-        print(f"Hero image generated: {image_filename}")
+        if generated_image_path:
+            # Re-save the file (without inserting image into content)
+            save_to_file(title, content, args.keyword)
+            print(f"Hero image generated: {image_filename}")
     
     # 3. Classify Content
     print("Classifying content...")
@@ -283,7 +297,7 @@ Select the most relevant ones (if any) and include them in the article using sta
     tag_ids = []
     
     try:
-        classifier = ArticleClassifier()
+        classifier = ArticleClassifier(gemini)
         classification = classifier.classify_article(title, content[:1000])
         print(f"Classification Result: {classification}")
         
@@ -321,6 +335,7 @@ Select the most relevant ones (if any) and include them in the article using sta
         print(f"Title: {optimized_title}")
         print(f"Meta Description: {meta_desc}")
         print(content[:500] + "...")
+        print_response_cache_stats(gemini)
         return
 
     # 5. Post to WordPress
@@ -426,6 +441,16 @@ Select the most relevant ones (if any) and include them in the article using sta
         if result:
             print(f"Successfully created post. ID: {result.get('id')}")
             print(f"Link: {result.get('link')}")
+
+            if args.source_url:
+                try:
+                    try:
+                        from automation.ledger import ArticleLedger
+                    except ImportError:
+                        from ledger import ArticleLedger
+                    ArticleLedger().set_status(args.source_url, "generated", wp_post_id=result.get('id'))
+                except Exception as e:
+                    print(f"Warning: Failed to update article ledger: {e}")
             
             # --- SNS Posting (X/Twitter) ---
             # Only post if status is 'publish' (not 'future' or 'draft')
@@ -476,6 +501,8 @@ Select the most relevant ones (if any) and include them in the article using sta
     except Exception as e:
         print(f"Failed to post to WordPress: {e}")
 
+    print_response_cache_stats(gemini)
+
 
 
 def save_to_file(title, content, keyword):
@@ -11,15 +11,17 @@ import markdown
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 try:
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_shared_client
     from automation.wp_client import WordPressClient
     from automation.seo_optimizer import SEOOptimizer
+    from automation.prompt_compactor import compact, WEEKLY_CONTEXT_TOKENS
 except ImportError:
     # Fallback for local run
     import gemini_client
-    from gemini_client import GeminiClient
+    from gemini_client import get_shared_client
     from wp_client import WordPressClient
     from seo_optimizer import SEOOptimizer
+    from prompt_compactor import compact, WEEKLY_CONTEXT_TOKENS
 
 def parse_article_content(text):
     """
@@ -51,7 +53,7 @@ def main():
     # 1. Initialize Clients
     try:
         wp = WordPressClient()
-        gemini = GeminiClient()
+        gemini = get_shared_client()
         print("Clients initialized.")
     except Exception as e:
         print(f"Error initializing clients: {e}")
@@ -73,17 +75,17 @@ def main():
     print(f"Found {len(posts)} posts.")
     
     # 3. Format Context for Gemini
+    # Every post gets an equal share of the context budget
+    per_post_tokens = WEEKLY_CONTEXT_TOKENS // len(posts)
     context_summaries = []
     for post in posts:
         # Strip HTML from excerpt and content
         title = post['title']['rendered']
         link = post['link']
         
-        # Simple HTML strip (regex)
+        # Strip markup / boilerplate and cut to this post's share of the budget
         content_html = post['content']['rendered']
-        clean_content = re.sub('<[^<]+?>', '', content_html).strip()
-        # Reduce multiple newlines
-        clean_content = re.sub(r'\n\s*\n', '\n', clean_content)
+        clean_content = compact(content_html, per_post_tokens)
         
         context_summaries.append({
             "title": title,
@@ -125,7 +127,7 @@ def main():
     print(f"\nGenerated Title: {title}")
     
     # 5. SEO Optimization (Meta Description)
-    optimizer = SEOOptimizer()
+    optimizer = SEOOptimizer(gemini)
     meta_desc = optimizer.generate_meta_description(title, content, keyword)
     print(f"Meta Description: {meta_desc}")
     
@@ -1,6 +1,11 @@
 import json
 from typing import List, Dict, Optional
 
+try:
+    from automation.prompt_compactor import compact, LINKER_CANDIDATE_TOKENS, LINKER_CONTEXT_TOKENS
+except ImportError:
+    from prompt_compactor import compact, LINKER_CANDIDATE_TOKENS, LINKER_CONTEXT_TOKENS
+
 class InternalLinkSuggester:
     """
     Suggests relevant internal links for a new article based on existing content.
@@ -104,11 +109,12 @@ class InternalLinkSuggester:
         candidates_text = ""
         for c in candidates:
             # Use the rich summary context if available
-            candidates_text += f"- ID: {c['id']} | {c['summary_context']}\n"
+            context = compact(c['summary_context'], LINKER_CANDIDATE_TOKENS).replace("\n", " / ")
+            candidates_text += f"- ID: {c['id']} | {context}\n"
 
         prompt = f"""
         You are an SEO expert. We are writing a new article about "{new_article_keyword}".
-        Context/Outline of new article: {new_article_context[:500]}...
+        Context/Outline of new article: {compact(new_article_context, LINKER_CONTEXT_TOKENS)}
 
         Evaluate the following existing articles and determine which ones are HIGHLY RELEVANT to the new article.
         Relevance means the existing article provides valuable supplementary information, detailed explanation of a sub-topic, or a related case study.
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Article Ledger for LogiShift
+
+Durable record (SQLite) of every article the pipeline has seen, keyed by
+normalized URL and content hash. Tracks collection, score, generation status
+and the resulting WordPress post ID, so re-runs never send the same article
+to Gemini twice.
+
+Also keeps per-source incremental cursors and feed telemetry (latency, size,
+yield, errors) used to decide when each feed is polled next.
+
+Status flow:
+    collected -> scored -> generated | duplicate | failed
+    collected -> filtered (dropped by the local pre-filter, never sent to Gemini)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+try:
+    from automation.url_utils import normalize_url, content_hash, title_hash
+except ImportError:
+    from url_utils import normalize_url, content_hash, title_hash
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+DEFAULT_LEDGER_PATH = os.path.join(CACHE_DIR, "ledger.sqlite3")
+
+# Content / headline matches only merge with stories collected this recently; recurring headlines
+# ("Weekly Freight Market Update") must not fold next week's issue into last week's
+STORY_MERGE_HOURS = 72
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    url_key      TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    title_hash   TEXT,
+    url          TEXT,
+    title        TEXT,
+    source       TEXT,
+    sources      TEXT,
+    summary      TEXT,
+    published    TEXT,
+    status       TEXT NOT NULL DEFAULT 'collected',
+    score        INTEGER,
+    reasoning    TEXT,
+    relevance    TEXT,
+    wp_post_id   INTEGER,
+    collected_at TEXT,
+    scored_at    TEXT,
+    updated_at   TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_articles_content_hash ON articles (content_hash);
+CREATE INDEX IF NOT EXISTS idx_articles_status ON articles (status);
+
+CREATE TABLE IF NOT EXISTS source_cursors (
+    source         TEXT PRIMARY KEY,
+    last_published TEXT NOT NULL,
+    last_entry_id  TEXT,
+    updated_at     TEXT
+);
+
+CREATE TABLE IF NOT EXISTS feed_stats (
+    source             TEXT PRIMARY KEY,
+    fetches            INTEGER NOT NULL DEFAULT 0,
+    errors             INTEGER NOT NULL DEFAULT 0,
+    consecutive_errors INTEGER NOT NULL DEFAULT 0,
+    latency_ewma       REAL,
+    bytes_ewma         REAL,
+    entries_ewma       REAL,
+    new_ewma           REAL,
+    new_per_hour_ewma  REAL,
+    error_rate_ewma    REAL,
+    last_error         TEXT,
+    last_fetch_at      TEXT,
+    last_new_at        TEXT,
+    poll_interval_h    REAL,
+    next_poll_at       TEXT
+);
+"""
+
+# Feed telemetry / adaptive polling
+EWMA_ALPHA = 0.3
+TARGET_NEW_PER_POLL = 1.0  # Poll about as often as one new story is expected
+MIN_POLL_HOURS = 0.0  # Hot feeds: every run
+MAX_POLL_HOURS = 72.0
+IDLE_POLL_STEP_HOURS = 6.0  # First back-off step after an empty poll; doubles while the feed stays quiet
+SLOW_FEED_SECONDS = 8.0  # Slow feeds (EWMA latency) are polled half as often
+POLL_GRACE_MINUTES = 30  # A feed due within this margin counts as due (runs are not exactly periodic)
+
+
+def _row_sources(row):
+    return json.loads(row["sources"]) if row["sources"] else [row["source"]]
+
+
+def _ewma(previous, sample):
+    if sample is None:
+        return previous
+    if previous is None:
+        return float(sample)
+    return EWMA_ALPHA * sample + (1 - EWMA_ALPHA) * previous
+
+
+def _poll_interval(previous_hours, new_entries, new_per_hour, consecutive_errors, latency):
+    """
+    Hours until a feed should be polled again.
+
+    Feeds that yielded new stories are polled at the rate they produce them;
+    empty or failing polls double the interval (from IDLE_POLL_STEP_HOURS) up to MAX_POLL_HOURS.
+    """
+    if consecutive_errors or not new_entries:
+        hours = max((previous_hours or 0) * 2, IDLE_POLL_STEP_HOURS)
+    elif new_per_hour:
+        hours = TARGET_NEW_PER_POLL / new_per_hour
+    else:
+        hours = MIN_POLL_HOURS
+    if latency is not None and latency > SLOW_FEED_SECONDS:
+        hours *= 2
+    return min(max(hours, MIN_POLL_HOURS), MAX_POLL_HOURS)
+
+
+class ArticleLedger:
+    """SQLite-backed ledger of processed articles. Safe to share between threads."""
+
+    def __init__(self, path=DEFAULT_LEDGER_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode: generate_article.py may write from a subprocess while we hold a connection
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Add columns introduced after the first ledger version."""
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(articles)")}
+        for column in ("title_hash", "sources"):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE articles ADD COLUMN {column} TEXT")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_articles_title_hash ON articles (title_hash)")
+
+    @staticmethod
+    def keys_for(article):
+        """Return (url_key, content_hash, title_hash) for an article dict. title_hash may be None."""
+        return (
+            normalize_url(article.get("url", "")),
+            content_hash(article.get("title", ""), article.get("summary", "")),
+            title_hash(article.get("title", ""))
+        )
+
+    def _find(self, article):
+        """Row for the same URL, or for the same content / headline collected within STORY_MERGE_HOURS."""
+        url_key, c_hash, t_hash = self.keys_for(article)
+        row = self.conn.execute("SELECT * FROM articles WHERE url_key = ?", (url_key,)).fetchone()
+        since = (datetime.now() - timedelta(hours=STORY_MERGE_HOURS)).isoformat()
+        if row is None:
+            row = self.conn.execute(
+                "SELECT * FROM articles WHERE content_hash = ? AND collected_at >= ? ORDER BY collected_at DESC LIMIT 1",
+                (c_hash, since)
+            ).fetchone()
+        if row is None and t_hash:
+            row = self.conn.execute(
+                "SELECT * FROM articles WHERE title_hash = ? AND collected_at >= ? ORDER BY collected_at DESC LIMIT 1",
+                (t_hash, since)
+            ).fetchone()
+        return row
+
+    def record_collected(self, articles):
+        """
+        Insert newly collected articles. A story already in the ledger (same URL, or
+        same content or headline collected recently) is not duplicated; its source
+        list is extended instead.
+
+        Returns the number of stories that were new to the ledger.
+        """
+        now = datetime.now().isoformat()
+        inserted = 0
+        with self._lock:
+            for article in articles:
+                url_key, c_hash, t_hash = self.keys_for(article)
+                sources = article.get("sources") or ([article["source"]] if article.get("source") else [])
+
+                row = self._find(article)
+                if row is not None:
+                    known = json.loads(row["sources"]) if row["sources"] else [row["source"]]
+                    merged = known + [s for s in sources if s not in known]
+                    if merged != known:
+                        self.conn.execute(
+                            "UPDATE articles SET sources = ?, updated_at = ? WHERE url_key = ?",
+                            (json.dumps(merged), now, row["url_key"])
+                        )
+                    continue
+
+                cursor = self.conn.execute(
+                    """INSERT OR IGNORE INTO articles
+                       (url_key, content_hash, title_hash, url, title, source, sources, summary, published, status, collected_at, updated_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'collected', ?, ?)""",
+                    (url_key, c_hash, t_hash, article.get("url"), article.get("title"), article.get("source"),
+                     json.dumps(sources), article.get("summary", ""), article.get("published"), now, now)
+                )
+                inserted += cursor.rowcount
+        return inserted
+
+    def filter_unscored(self, articles):
+        """
+        Return only the articles that have never been scored (by URL, content or headline hash).
+        Also drops repeats within the given list.
+        """
+        fresh = []
+        seen = set()
+        with self._lock:
+            for article in articles:
+                keys = [k for k in self.keys_for(article) if k]
+                if any(k in seen for k in keys):
+                    continue
+                seen.update(keys)
+
+                row = self._find(article)
+                if row is not None and row["status"] != "collected":
+                    continue
+                if row is not None and row["url"] and row["url"] != article.get("url"):
+                    # Same story stored under another URL: keep one record so statuses line up
+                    article["url"] = row["url"]
+                fresh.append(article)
+        return fresh
+
+    def get_score(self, article):
+        """Return the stored scoring result for an article (scorer output shape), or None."""
+        with self._lock:
+            row = self._find(article)
+        if row is None or row["score"] is None:
+            return None
+        return {
+            "title": article.get("title"),
+            "url": article.get("url"),
+            "source": article.get("source"),
+            "sources": article.get("sources", [article.get("source")]),
+            "summary": article.get("summary", ""),
+            "score": row["score"],
+            "reasoning": row["reasoning"] or "",
+            "relevance": row["relevance"] or "low"
+        }
+
+    def record_scores(self, scored_articles):
+        """Store scoring results. Errored results are not recorded so they get retried."""
+        now = datetime.now().isoformat()
+        with self._lock:
+            for res in scored_articles:
+                if res.get("relevance") == "error":
+                    continue
+                url_key, c_hash, t_hash = self.keys_for(res)
+                row = self._find(res)
+                if row is not None:
+                    url_key = row["url_key"]
+                else:
+                    self.conn.execute(
+                        """INSERT OR IGNORE INTO articles
+                           (url_key, content_hash, title_hash, url, title, source, summary, status, collected_at, updated_at)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, 'collected', ?, ?)""",
+                        (url_key, c_hash, t_hash, res.get("url"), res.get("title"), res.get("source"),
+                         res.get("summary", ""), now, now)
+                    )
+                self.conn.execute(
+                    """UPDATE articles
+                       SET score = ?, reasoning = ?, relevance = ?, scored_at = ?, updated_at = ?,
+                           status = CASE WHEN status = 'collected' THEN 'scored' ELSE status END
+                       WHERE url_key = ?""",
+                    (res.get("score", 0), res.get("reasoning", ""), res.get("relevance", "low"), now, now, url_key)
+                )
+
+    def set_status(self, url, status, wp_post_id=None):
+        """Update the generation status (generated / duplicate / failed) of an article."""
+        now = datetime.now().isoformat()
+        with self._lock:
+            self.conn.execute(
+                """UPDATE articles
+                   SET status = ?, wp_post_id = COALESCE(?, wp_post_id), updated_at = ?
+                   WHERE url_key = ?""",
+                (status, wp_post_id, now, normalize_url(url))
+            )
+
+    def get_status(self, url):
+        """Return the current status for a URL, or None if unknown."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT status FROM articles WHERE url_key = ?", (normalize_url(url),)
+            ).fetchone()
+        return row["status"] if row else None
+
+    def get_pending(self, threshold, hours=48):
+        """
+        Return articles scored within the last N hours at or above threshold
+        that have not been generated yet (e.g. cut by --limit in an earlier run).
+        """
+        since = (datetime.now() - timedelta(hours=hours)).isoformat()
+        with self._lock:
+            rows = self.conn.execute(
+                """SELECT * FROM articles
+                   WHERE status = 'scored' AND score >= ? AND scored_at >= ?
+                   ORDER BY score DESC""",
+                (threshold, since)
+            ).fetchall()
+        return [{
+            "title": row["title"],
+            "url": row["url"],
+            "source": row["source"],
+            "sources": _row_sources(row),
+            "summary": row["summary"] or "",
+            "score": row["score"],
+            "reasoning": row["reasoning"] or "",
+            "relevance": row["relevance"] or "low"
+        } for row in rows]
+
+    def get_scored_history(self, limit=None, oldest_first=False):
+        """
+        Return [(article, score)] for every Gemini-scored article, newest first (pre-filter training data).
+
+        oldest_first orders by insertion instead, which later scoring runs do not reshuffle
+        (for resumable jobs such as rescore_archive.py).
+        """
+        order = "rowid" if oldest_first else "scored_at DESC"
+        query = f"SELECT url, title, summary, source, score FROM articles WHERE score IS NOT NULL ORDER BY {order}"
+        params = ()
+        if limit:
+            query += " LIMIT ?"
+            params = (limit,)
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [({"url": row["url"], "title": row["title"], "summary": row["summary"] or "",
+                  "source": row["source"]}, row["score"])
+                for row in rows]
+
+    def get_unscored(self, hours=72):
+        """
+        Return articles collected within the last N hours that were never scored
+        (e.g. left over after an early exit). Needed with incremental collection,
+        where a source cursor has already moved past them.
+        """
+        since = (datetime.now() - timedelta(hours=hours)).isoformat()
+        with self._lock:
+            rows = self.conn.execute(
+                """SELECT * FROM articles
+                   WHERE status = 'collected' AND collected_at >= ?
+                   ORDER BY collected_at""",
+                (since,)
+            ).fetchall()
+        return [{
+            "title": row["title"],
+            "url": row["url"],
+            "published": row["published"] or "Unknown",
+            "source": row["source"],
+            "sources": _row_sources(row),
+            "summary": row["summary"] or ""
+        } for row in rows]
+
+    def get_cursor(self, source):
+        """Return {"published": ISO 8601, "entry_id": str} for a source, or None."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT last_published, last_entry_id FROM source_cursors WHERE source = ?", (source,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"published": row["last_published"], "entry_id": row["last_entry_id"]}
+
+    def set_cursor(self, source, cursor):
+        """Persist a source's high-water-mark cursor."""
+        with self._lock:
+            self.conn.execute(
+                """INSERT INTO source_cursors (source, last_published, last_entry_id, updated_at)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT(source) DO UPDATE SET
+                       last_published = excluded.last_published,
+                       last_entry_id = excluded.last_entry_id,
+                       updated_at = excluded.updated_at""",
+                (source, cursor["published"], cursor.get("entry_id"), datetime.now().isoformat())
+            )
+
+    def record_fetch(self, source, latency=None, nbytes=None, entries=0, new_entries=0, error=None):
+        """
+        Fold one feed fetch into the source's telemetry and schedule its next poll.
+
+        Args:
+            latency: Fetch + parse time in seconds
+            nbytes: Downloaded bytes (0 for a 304)
+            entries: Entries in the feed
+            new_entries: Stories that were new to the ledger
+            error: Error message if the fetch failed, else None
+        """
+        now = datetime.now()
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM feed_stats WHERE source = ?", (source,)).fetchone()
+            row = dict(row) if row else {}
+
+            new_per_hour = None
+            if not error and row.get("last_fetch_at"):
+                elapsed_h = (now - datetime.fromisoformat(row["last_fetch_at"])).total_seconds() / 3600
+                new_per_hour = new_entries / max(elapsed_h, 1.0)
+
+            consecutive_errors = (row.get("consecutive_errors") or 0) + 1 if error else 0
+            latency_ewma = _ewma(row.get("latency_ewma"), latency)
+            new_per_hour_ewma = _ewma(row.get("new_per_hour_ewma"), new_per_hour)
+            interval = _poll_interval(row.get("poll_interval_h"), new_entries, new_per_hour_ewma,
+                                      consecutive_errors, latency_ewma)
+
+            self.conn.execute(
+                """INSERT OR REPLACE INTO feed_stats
+                   (source, fetches, errors, consecutive_errors, latency_ewma, bytes_ewma, entries_ewma, new_ewma,
+                    new_per_hour_ewma, error_rate_ewma, last_error, last_fetch_at, last_new_at, poll_interval_h, next_poll_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (source,
+                 (row.get("fetches") or 0) + 1,
+                 (row.get("errors") or 0) + (1 if error else 0),
+                 consecutive_errors,
+                 latency_ewma,
+                 _ewma(row.get("bytes_ewma"), None if error else nbytes),
+                 _ewma(row.get("entries_ewma"), None if error else entries),
+                 _ewma(row.get("new_ewma"), None if error else new_entries),
+                 new_per_hour_ewma,
+                 _ewma(row.get("error_rate_ewma"), 1.0 if error else 0.0),
+                 error or row.get("last_error"),
+                 now.isoformat(),
+                 now.isoformat() if new_entries else row.get("last_new_at"),
+                 interval,
+                 (now + timedelta(hours=interval)).isoformat())
+            )
+
+    def get_feed_stats(self):
+        """Return {source: telemetry dict} for every source fetched so far."""
+        with self._lock:
+            rows = self.conn.execute("SELECT * FROM feed_stats ORDER BY source").fetchall()
+        return {row["source"]: dict(row) for row in rows}
+
+    def is_due(self, source, now=None, min_interval_hours=None):
+        """
+        True if a source has no telemetry yet or its next poll time has come.
+        min_interval_hours (e.g. from the source registry) is a floor on the adaptive interval.
+        """
+        now = now or datetime.now()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT next_poll_at, last_fetch_at FROM feed_stats WHERE source = ?", (source,)
+            ).fetchone()
+        if row is None or not row["next_poll_at"]:
+            return True
+        due_at = datetime.fromisoformat(row["next_poll_at"])
+        if min_interval_hours and row["last_fetch_at"]:
+            due_at = max(due_at, datetime.fromisoformat(row["last_fetch_at"]) + timedelta(hours=min_interval_hours))
+        return due_at <= now + timedelta(minutes=POLL_GRACE_MINUTES)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
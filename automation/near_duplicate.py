@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Index for LogiShift
+
+Local replacement for the per-article LLM duplicate check. Every published
+post (title + stored AI summary) is shingled and reduced to a MinHash
+signature; an LSH band index then returns candidate duplicates for a new
+article in a few milliseconds, across the whole archive.
+
+Two write-ups of the same event typically share only 0.1-0.15 Jaccard, the
+same range as unrelated stories on the same topic, so similarity alone cannot
+decide. Each candidate is also compared on its key terms (title words and
+named entities):
+- similarity >= DUPLICATE_THRESHOLD: duplicate, decided locally
+- similarity >= CONFIRM_THRESHOLD, or >= BORDERLINE_THRESHOLD with key-term
+  overlap >= TERM_OVERLAP_THRESHOLD: borderline, confirmed with Gemini
+  (GeminiClient.check_duplication)
+- anything else: not a duplicate, decided locally
+The newest posts are always compared directly, so the likeliest duplicates
+do not depend on the LSH candidate probability.
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+
+try:
+    from automation.story_clusters import STOPWORDS
+except ImportError:
+    from story_clusters import STOPWORDS
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+DEFAULT_INDEX_PATH = os.path.join(CACHE_DIR, "near_duplicate_index.json")
+
+NUM_PERM = 200
+BANDS = 100  # 100 bands x 2 rows: candidate threshold (1/100)^(1/2) = 0.10 (0.13 -> 82%, 0.2 -> 98%)
+SEED = 1729
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+DUPLICATE_THRESHOLD = 0.6  # >= : duplicate without asking Gemini
+CONFIRM_THRESHOLD = 0.3  # >= : ask Gemini whatever the key terms say
+BORDERLINE_THRESHOLD = 0.1  # >= : ask Gemini if the key terms overlap too; matches the LSH curve
+TERM_OVERLAP_THRESHOLD = 0.3  # Shared key terms / key terms of the smaller story
+MAX_CANDIDATES = 10  # Borderline candidates shown to Gemini
+RECENT_DOCS = 30  # Newest posts compared directly, LSH hit or not
+
+_CJK = re.compile(r'[\u3040-\u30ff\u4e00-\u9fff]')
+
+# Same permutations on every run so persisted signatures stay comparable
+_rng = random.Random(SEED)
+_PERMUTATIONS = [(_rng.randint(1, MERSENNE_PRIME - 1), _rng.randint(0, MERSENNE_PRIME - 1)) for _ in range(NUM_PERM)]
+
+
+def shingles(text):
+    """Word bigrams (plus unigrams) for Latin text, character trigrams for CJK runs."""
+    text = re.sub(r'<[^<]+?>', ' ', text or "")
+    tokens = re.findall(r'\w+', text.casefold())
+
+    result = set()
+    latin = [t for t in tokens if not _CJK.search(t)]
+    result.update(latin)
+    result.update(f"{a} {b}" for a, b in zip(latin, latin[1:]))
+    for token in tokens:
+        if _CJK.search(token):
+            result.update(token[i:i + 3] for i in range(max(1, len(token) - 2)))
+    return result
+
+
+def key_terms(title, text=""):
+    """Distinctive terms of a story: title words plus capitalized names (entities) in the text."""
+    title = re.sub(r'<[^<]+?>', ' ', title or "")
+    text = re.sub(r'<[^<]+?>', ' ', text or "")
+    terms = set()
+    for word in re.findall(r'\w+', title.casefold()):
+        if _CJK.search(word):
+            terms.update(word[i:i + 2] for i in range(max(1, len(word) - 1)))
+        elif len(word) > 2 and word not in STOPWORDS:
+            terms.add(word)
+    terms.update(w.casefold() for w in re.findall(r'\b[A-Z][\w&-]+', text) if w.casefold() not in STOPWORDS)
+    return terms
+
+
+def term_overlap(terms_a, terms_b):
+    """Shared terms relative to the smaller set (0 if either is empty)."""
+    if not terms_a or not terms_b:
+        return 0.0
+    return len(terms_a & terms_b) / min(len(terms_a), len(terms_b))
+
+
+def minhash(shingle_set):
+    """MinHash signature (NUM_PERM ints) of a shingle set."""
+    if not shingle_set:
+        return [MAX_HASH] * NUM_PERM
+    hashed = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+              for s in shingle_set]
+    return [min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashed) for a, b in _PERMUTATIONS]
+
+
+def estimate_similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+class NearDuplicateIndex:
+    """MinHash + LSH index over archive posts, persisted as JSON."""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.docs = {}  # doc_id -> {"title": str, "signature": [int], "terms": [str], "date": str}
+        self.last_synced = None
+        self._bands = {}
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("num_perm") == NUM_PERM and data.get("seed") == SEED:
+                    self.docs = data.get("docs", {})
+                    self.last_synced = data.get("last_synced")
+                    for doc_id, doc in self.docs.items():
+                        self._add_bands(doc_id, doc["signature"])
+            except Exception as e:
+                print(f"Warning: Failed to load near-duplicate index ({e}). Rebuilding.")
+
+    def _band_keys(self, signature):
+        rows = NUM_PERM // BANDS
+        return [f"{b}:" + ",".join(map(str, signature[b * rows:(b + 1) * rows])) for b in range(BANDS)]
+
+    def _add_bands(self, doc_id, signature):
+        for key in self._band_keys(signature):
+            self._bands.setdefault(key, set()).add(doc_id)
+
+    def add(self, doc_id, title, text="", date=None):
+        """Index a document (re-adding an existing ID is a no-op)."""
+        doc_id = str(doc_id)
+        with self._lock:
+            if doc_id in self.docs:
+                return
+            signature = minhash(shingles(f"{title}\n{text}"))
+            self.docs[doc_id] = {"title": title, "signature": signature,
+                                 "terms": sorted(key_terms(title, text)), "date": date}
+            self._add_bands(doc_id, signature)
+
+    def query(self, title, text="", min_similarity=BORDERLINE_THRESHOLD, recent=RECENT_DOCS):
+        """
+        Return candidate duplicates as [(doc_id, similarity, title)], best first.
+
+        LSH candidates plus the `recent` newest documents, filtered by estimated similarity.
+        """
+        signature = minhash(shingles(f"{title}\n{text}"))
+        recent_ids = self._recent_ids(recent)
+        with self._lock:
+            candidates = set(recent_ids)
+            for key in self._band_keys(signature):
+                candidates.update(self._bands.get(key, ()))
+            results = []
+            for doc_id in candidates:
+                doc = self.docs[doc_id]
+                similarity = estimate_similarity(signature, doc["signature"])
+                if similarity >= min_similarity:
+                    results.append((doc_id, similarity, doc["title"]))
+        results.sort(key=lambda r: r[1], reverse=True)
+        return results
+
+    def _recent_ids(self, limit):
+        """IDs of the `limit` newest documents (this run's additions, which have no date, first)."""
+        if not limit:
+            return []
+        with self._lock:
+            dated = [(doc.get("date") or "9999", doc_id) for doc_id, doc in self.docs.items()]
+        return [doc_id for _, doc_id in sorted(dated, reverse=True)[:limit]]
+
+    def terms(self, doc_id):
+        """Key terms stored for a document."""
+        return set(self.docs[doc_id].get("terms") or ())
+
+    def sync_from_wordpress(self, wp_client, per_page=100, max_pages=50):
+        """
+        Add published posts to the index. The first sync walks the whole archive;
+        later syncs only fetch posts newer than the last synced date.
+        """
+        added = 0
+        newest = self.last_synced
+        for page in range(1, max_pages + 1):
+            posts = wp_client.get_posts(limit=per_page, status="publish", after=self.last_synced, page=page)
+            if not posts:
+                break
+            for post in posts:
+                doc_id = f"wp:{post['id']}"
+                if doc_id in self.docs:
+                    continue
+                self.add(doc_id, post['title']['rendered'], _post_summary(post), date=post.get('date'))
+                added += 1
+                if post.get('date') and (newest is None or post['date'] > newest):
+                    newest = post['date']
+            if len(posts) < per_page:
+                break
+        self.last_synced = newest
+        print(f"Near-duplicate index: {added} new post(s) indexed, {len(self.docs)} total.")
+        return added
+
+    def save(self):
+        """Write the index to disk (atomic replace)."""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "num_perm": NUM_PERM,
+                    "seed": SEED,
+                    "last_synced": self.last_synced,
+                    "docs": self.docs
+                }, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+
+def _post_summary(post):
+    """Stored AI structured summary of a post, falling back to its excerpt."""
+    meta_val = (post.get('meta') or {}).get('ai_structured_summary')
+    if meta_val:
+        try:
+            summary = json.loads(meta_val) if isinstance(meta_val, str) else meta_val
+            return f"{summary.get('summary', '')} {' '.join(summary.get('entities', []))}"
+        except Exception:
+            pass
+    excerpt = (post.get('excerpt') or {}).get('rendered', '')
+    return re.sub(r'<[^<]+?>', '', excerpt)
+
+
+def check_duplicate(index, title, summary, gemini_client=None):
+    """
+    Decide whether a new article duplicates an indexed one.
+
+    Near-identical copies and clear non-matches are decided locally; only
+    borderline candidates (see module docstring) are confirmed with Gemini.
+    Returns (is_duplicate, matched_title or None).
+    """
+    matches = index.query(title, summary)
+    if not matches:
+        return False, None
+
+    doc_id, similarity, matched_title = matches[0]
+    print(f"Near-duplicate candidates: {len(matches)} (best {similarity:.2f}: {matched_title})")
+    if similarity >= DUPLICATE_THRESHOLD:
+        return True, matched_title
+
+    terms = key_terms(title, summary)
+    borderline = [t for d, s, t in matches
+                  if s >= CONFIRM_THRESHOLD or term_overlap(terms, index.terms(d)) >= TERM_OVERLAP_THRESHOLD]
+    if not borderline or gemini_client is None:
+        return False, None
+
+    borderline = borderline[:MAX_CANDIDATES]
+    if gemini_client.check_duplication(title, summary, borderline):
+        return True, borderline[0]
+    return False, None
@@ -3,18 +3,21 @@
 LogiShift Automation Pipeline
 
 Orchestrates the flow:
-1. Collection (collector.py)
+1. Collection (collector.py) - streamed into scoring as each feed finishes
 2. Scoring (scorer.py)
 3. Selection (Filter high scores)
 4. Generation (generate_article.py)
 """
 
 import argparse
+import itertools
 import json
+import math
 import os
+import random
 import sys
 import subprocess
-from datetime import datetime
+import time
 
 def run_command(command):
     """Run a shell command and return output."""
@@ -34,8 +37,21 @@ def main():
     parser.add_argument("--limit", type=int, default=2, help="Max articles to generate per run")
     parser.add_argument("--score-limit", type=int, default=0, help="Max articles to score (0 for all)")
     parser.add_argument("--dry-run", action="store_true", help="Dry run mode (no posting)")
+    parser.add_argument("--no-ledger", action="store_true", help="Ignore the article ledger (re-score everything collected)")
+    parser.add_argument("--incremental", action="store_true", help="Collect only entries newer than each source's cursor (--hours/--days only bootstrap new sources)")
+    parser.add_argument("--no-speculative", action="store_true", help="Do not start extraction/summarization of top candidates while scoring is still running")
+    parser.add_argument("--no-cluster", action="store_true", help="Score every collected story separately (skip near-identical story clustering)")
+    parser.add_argument("--no-prefilter", action="store_true", help="Send every collected article to Gemini (skip the local relevance pre-filter)")
+    parser.add_argument("--no-score-cache", action="store_true", help="Do not reuse or store scores in the persistent score cache")
+    parser.add_argument("--batch-token-budget", type=int, default=None, help="Estimated article tokens per scoring request (default: scorer.BATCH_TOKEN_BUDGET)")
+    parser.add_argument("--score-concurrency", type=int, default=None, help="Scoring batches sent to Gemini in parallel (default: scorer.SCORING_CONCURRENCY)")
+    parser.add_argument("--poll-all", action="store_true", help="With --incremental, poll every source even if its adaptive poll interval has not elapsed")
+    parser.add_argument("--deadline", type=float, default=None, help="Wall-clock budget in minutes; sheds scoring, then hero images, then articles to finish in time")
     
     args = parser.parse_args()
+
+    if args.incremental and args.no_ledger:
+        parser.error("--incremental requires the article ledger (drop --no-ledger)")
     
     base_dir = os.path.dirname(os.path.abspath(__file__))
     articles_file = os.path.join(base_dir, "collected_articles.json")
@@ -46,16 +62,33 @@ def main():
     
     # Import modules directly
     sys.path.append(os.path.dirname(base_dir))
-    from automation.collector import fetch_rss, DEFAULT_SOURCES
-    from automation.scorer import score_articles_batch
+    from automation.collector import iter_feeds, DEFAULT_SOURCES
+    from automation.source_registry import get_registry
+    from automation.feed_cache import FeedCache
+    from automation.ledger import ArticleLedger
+    from automation.url_utils import normalize_url
+    from automation.prefilter import load_or_train, AUDIT_RATE
+    from automation.story_clusters import StoryClusterer
+    from automation.speculative import SpeculativePrep
+    from automation.scorer import score_batches, iter_token_batches, open_score_cache, SCORING_CONCURRENCY, BATCH_TOKEN_BUDGET, MAX_BATCH_ITEMS
     from automation.url_reader import extract_content
     from automation.summarizer import summarize_article
     from automation.classifier import ArticleClassifier
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_shared_client
     from automation.wp_client import WordPressClient
+    from automation.near_duplicate import NearDuplicateIndex, check_duplicate
+    from automation.deadline import RunBudget
+
+    budget = RunBudget(args.deadline)
+    budget.begin("collection")
+    if budget.limited:
+        print(f"Deadline: {args.deadline:g} min for this run.")
     
-    collected_articles = []
-    if args.hours:
+    if args.incremental:
+        print("Collecting articles newer than each source's cursor (incremental)...")
+        if args.hours is None and args.days is None:
+            args.hours = 6
+    elif args.hours:
         print(f"Collecting articles from last {args.hours} hours...")
     else:
         # Default to 6 hours if neither is specified
@@ -65,32 +98,114 @@ def main():
         else:
             print(f"Collecting articles from last {args.days} days...")
             
-    for name, url in DEFAULT_SOURCES.items():
-        fetched = fetch_rss(url, name, days=args.days, hours=args.hours)
-        collected_articles.extend(fetched)
-        
-    print(f"Collected {len(collected_articles)} articles.")
-    
-    # 2. Scoring
-    print("\n=== Step 2: Scoring ===")
-    scored_articles = []
-    
-    articles_to_score = collected_articles
-    if args.score_limit > 0:
-        print(f"Limiting scoring to first {args.score_limit} articles.")
-        articles_to_score = collected_articles[:args.score_limit]
-    
-    # Initialize GeminiClient once
+    ledger = None if args.no_ledger else ArticleLedger()
+
+    # One GeminiClient for the whole run (shared by scoring, classification, summarization)
     try:
-        gemini_client = GeminiClient()
+        gemini_client = get_shared_client()
         print("GeminiClient initialized.")
     except Exception as e:
         print(f"Error initializing Gemini: {e}")
         gemini_client = None
 
-    if gemini_client and articles_to_score:
-        batch_size = 10
-        print(f"Scoring {len(articles_to_score)} articles in batches of {batch_size}...")
+    # Cursors have moved past anything left unscored by an earlier run (e.g. early exit), so pick those up from the ledger
+    backlog = []
+    if args.incremental:
+        backlog = ledger.filter_unscored(ledger.get_unscored())
+        if backlog:
+            print(f"Ledger: {len(backlog)} collected-but-unscored article(s) from earlier runs queued first.")
+
+    # Collection is streamed: each feed's articles are queued for scoring as soon as the feed finishes,
+    # so the first scoring batches overlap with slow feeds still downloading.
+    feed_stream = iter_feeds(
+        DEFAULT_SOURCES,
+        days=args.days,
+        hours=args.hours,
+        cache=FeedCache(),
+        ledger=ledger,
+        incremental=args.incremental,
+        adaptive=args.incremental and not args.poll_all,
+        poll_intervals=get_registry().poll_intervals()
+    )
+
+    # Local pre-filter: drop articles a model trained on past Gemini scores rates as clearly irrelevant.
+    # A small random sample of dropped articles is still scored to measure live recall.
+    prefilter = None
+    if ledger is not None and not args.no_prefilter:
+        prefilter = load_or_train(ledger, args.threshold)
+        if prefilter is None:
+            print("Prefilter: disabled until enough scored history exists.")
+    prefilter_dropped = 0
+    audit_urls = set()
+    audit_rng = random.Random()
+
+    # Rewrites of the same story from several feeds are clustered; only one representative per cluster is scored
+    clusterer = None if args.no_cluster else StoryClusterer()
+
+    collected_count = 0
+    queued_keys = set()
+    def article_stream():
+        nonlocal collected_count, prefilter_dropped
+        for article in itertools.chain(backlog, itertools.chain.from_iterable(feed_stream)):
+            key = normalize_url(article.get("url", ""))
+            if key in queued_keys:
+                continue
+            queued_keys.add(key)
+            collected_count += 1
+            if prefilter is not None and not prefilter.keep(article):
+                if audit_rng.random() < AUDIT_RATE:
+                    audit_urls.add(article.get("url"))
+                else:
+                    prefilter_dropped += 1
+                    ledger.set_status(article.get("url", ""), "filtered")
+                    continue
+            if clusterer is not None:
+                _, is_new = clusterer.add(article)
+                if not is_new:
+                    continue
+            yield article
+
+    articles_to_score = article_stream()
+    if args.score_limit > 0:
+        print(f"Limiting scoring to first {args.score_limit} articles.")
+        articles_to_score = itertools.islice(articles_to_score, args.score_limit)
+    
+    # Generation prep (type classification, URL reading + summarization) for one candidate.
+    # Runs speculatively on worker threads while scoring continues, or inline during generation.
+    classifier = ArticleClassifier(gemini_client) if gemini_client else None
+
+    def prepare_context(article):
+        article_type = classifier.classify_type(article['title'], article['summary'], article.get("source", ""))
+        summary_data = None
+        if article_type in ["news", "global"]:
+            try:
+                article_content = extract_content(article['url'], article['source'])
+                if article_content['content'] and "Error" not in article_content['title']:
+                    summary_data = summarize_article(article_content['content'], article['title'], client=gemini_client)
+            except Exception as e:
+                print(f"Error during context creation: {e}")
+        return {"article_type": article_type, "summary_data": summary_data}
+
+    speculative = None
+    if classifier is not None and not args.no_speculative and args.limit > 0:
+        speculative = SpeculativePrep(prepare_context, limit=args.limit)
+
+    # High scorers from earlier runs that were never generated (e.g. cut by --limit) compete for the top slots too
+    pending = ledger.get_pending(args.threshold) if ledger is not None else []
+    if speculative is not None:
+        for article in pending:
+            speculative.offer(article)
+
+    # 2. Scoring
+    print("\n=== Step 2: Scoring (streaming) ===")
+    budget.begin("scoring")
+    scored_articles = []
+    batch_count = 0
+
+    if gemini_client:
+        token_budget = args.batch_token_budget or BATCH_TOKEN_BUDGET
+        concurrency = args.score_concurrency or SCORING_CONCURRENCY
+        print(f"Scoring articles in batches of ~{token_budget} tokens ({concurrency} in parallel) as feeds arrive...")
         
         # Early Exit Logic
         high_score_count = 0
@@ -101,34 +216,77 @@ def main():
         
         print(f"Early Exit Threshold configured: Stop if {early_exit_threshold} high-score articles found.")
 
-        for i in range(0, len(articles_to_score), batch_size):
-            batch = articles_to_score[i:i + batch_size]
-            print(f"[{i+1}-{min(i+batch_size, len(articles_to_score))}/{len(articles_to_score)}] Processing batch...")
+        # Batches are dispatched concurrently; results arrive in input order, and breaking out
+        # of the loop cancels batches that have not been sent yet.
+        score_cache = None if args.no_score_cache else open_score_cache()
+        scored_stream = score_batches(gemini_client, iter_token_batches(articles_to_score, token_budget=token_budget),
+                                      ledger=ledger, max_in_flight=concurrency, cache=score_cache,
+                                      record_latency=lambda seconds: budget.record("score_batch", seconds))
+        # Time kept for generating --limit articles with images; scoring is the first thing shed
+        generation_reserve = args.limit * (budget.estimate("prepare") + budget.estimate("generate"))
+        for i, batch, batch_results in scored_stream:
+            print(f"[{i+1}-{i+len(batch)}] Batch scored.")
+            batch_count += 1
+            scored_articles.extend(batch_results)
+            # Simple progress indication & Count High Scores
+            for res in batch_results:
+                 score = res.get('score', 0)
+                 print(f"  - Scored: {res.get('title', 'Unknown')[:40]}... -> {score} pts")
+                 if score >= args.threshold:
+                     high_score_count += 1
+                     if speculative is not None:
+                         speculative.offer(res)
             
-            try:
-                batch_results = score_articles_batch(gemini_client, batch, start_id=i)
-                scored_articles.extend(batch_results)
-                 # Simple progress indication & Count High Scores
-                for res in batch_results:
-                     score = res.get('score', 0)
-                     print(f"  - Scored: {res.get('title', 'Unknown')[:40]}... -> {score} pts")
-                     if score >= args.threshold:
-                         high_score_count += 1
-                
-                # Check for Early Exit
-                if high_score_count >= early_exit_threshold:
-                    print(f"\n🚀 Early Exit: Found {high_score_count} candidate articles (Target >= {early_exit_threshold}). Stopping scoring.")
-                    break
+            # Check for Early Exit
+            if high_score_count >= early_exit_threshold:
+                print(f"\n🚀 Early Exit: Found {high_score_count} candidate articles (Target >= {early_exit_threshold}). Stopping scoring.")
+                break
 
-            except Exception as e:
-                print(f"Error processing batch {i}: {e}")
-    elif not gemini_client:
-        print("Skipping scoring due to Client initialization failure.")
+            # Up to `concurrency` batches stay in flight (and are drained on exit); they must leave time for generation
+            if not budget.can_afford("score_batch", count=concurrency, keep=generation_reserve):
+                budget.note_shed(f"stopped scoring after {batch_count} batch(es) to keep time for generation")
+                break
+        scored_stream.close()
     else:
-        print("No articles to score.")
+        print("Skipping scoring due to Client initialization failure.")
+        # Still drain the stream so collected articles and cursors are recorded
+        for _ in articles_to_score:
+            pass
+
+    # Stop feeds that are still pending (early exit); unscored articles stay in the ledger for the next run.
+    # Safe here: scored_stream.close() has joined the thread that was reading the feed stream.
+    feed_stream.close()
+    print(f"Collected {collected_count} articles, scored {len(scored_articles)}.")
+    if clusterer is not None and clusterer.clustered_count:
+        # Members share their representative's score; only the representative stays a candidate
+        member_results = clusterer.propagate(scored_articles)
+        print(f"Clusters: {clusterer.clustered_count} near-identical article(s) folded into {len(clusterer.members)} "
+              f"story cluster(s); score propagated to {len(member_results)}.")
+        if ledger is not None and member_results:
+            ledger.record_scores(member_results)
+            for res in member_results:
+                ledger.set_status(res["url"], "duplicate")
+            represented = {res["cluster_of"] for res in member_results}
+            ledger.record_collected([res for res in scored_articles if res.get("url") in represented])
+    if prefilter is not None:
+        audited = [a for a in scored_articles if a.get("url") in audit_urls]
+        missed = [a for a in audited if a["score"] >= args.threshold]
+        per_call = len(scored_articles) / batch_count if batch_count else MAX_BATCH_ITEMS
+        print(f"Prefilter: dropped {prefilter_dropped} article(s) (~{math.ceil(prefilter_dropped / per_call)} scoring call(s) saved); "
+              f"held-out recall {prefilter.metrics.get('recall', 1) * 100:.1f}%.")
+        if audited:
+            print(f"Prefilter audit: {len(missed)} of {len(audited)} sampled dropped article(s) scored >= {args.threshold}.")
             
     # Filter
     high_score_articles = [a for a in scored_articles if a["score"] >= args.threshold]
+
+    # Re-queue high scorers from earlier runs that were never generated (e.g. cut by --limit)
+    known_urls = {a["url"] for a in high_score_articles}
+    pending = [a for a in pending if a["url"] not in known_urls]
+    if pending:
+        print(f"Ledger: {len(pending)} previously scored candidate(s) re-queued for generation.")
+        high_score_articles.extend(pending)
+
     high_score_articles.sort(key=lambda x: x["score"], reverse=True)
     
     print(f"\nFound {len(high_score_articles)} articles above threshold {args.threshold}.")
@@ -138,41 +296,52 @@ def main():
     
     if not high_score_articles:
         print("No articles to generate (Score below threshold). Skipping generation step.")
+        if speculative is not None:
+            speculative.shutdown()
+        budget.report()
+        budget.save()
         # Exit normally
         return
 
+    budget.begin("generation")
     count = 0
     
-    # Initialize Classifier
-    classifier = ArticleClassifier()
+    # Initialize Classifier (normally already created for speculative prep)
+    if classifier is None:
+        classifier = ArticleClassifier()
     
     # Initialize WP Client
     wp_client = WordPressClient()
     
-    # Fetch recent posts for deduplication context
-    print("Fetching recent WordPress posts for deduplication check...")
-    existing_posts = wp_client.get_posts(limit=30) # Check last 30 posts (~1-2 weeks)
-    existing_titles = []
-    if existing_posts:
-        existing_titles = [p['title']['rendered'] for p in existing_posts]
-        print(f"Loaded {len(existing_titles)} existing post titles.")
-    else:
-        print("Warning: Could not fetch existing posts (or none exist). Deduplication will only check within current batch.")
-
-    generated_titles_this_run = []
+    # Sync the near-duplicate index with the WordPress archive (only new posts after the first run)
+    print("Syncing near-duplicate index with WordPress posts...")
+    dup_index = NearDuplicateIndex()
+    dup_index.sync_from_wordpress(wp_client)
+    # Save before this run's candidates are added, so dry-run items never persist
+    dup_index.save()
 
     for article in high_score_articles:
         if count >= args.limit:
             break
+
+        # Last thing shed: articles that no longer fit even without a hero image
+        if not budget.can_afford("prepare", keep=budget.estimate("generate_no_image")):
+            budget.note_shed(f"skipped generation of {args.limit - count} more article(s)")
+            break
             
         print(f"Generating article for: {article['title']}")
         print(f"Score: {article['score']}")
         print(f"Reason: {article['reasoning']}")
         
-        # Determine Type
-        source = article.get("source", "")
-        # Use dynamic classification
-        article_type = classifier.classify_type(article['title'], article['summary'], source)
+        # Type + context: prepared speculatively during scoring if this article was in the top --limit
+        prepared = speculative.take(article) if speculative is not None else None
+        if prepared is not None:
+            print("Using speculatively prepared context.")
+        else:
+            prep_start = time.monotonic()
+            prepared = prepare_context(article)
+            budget.record("prepare", time.monotonic() - prep_start)
+        article_type = prepared["article_type"]
         print(f"Type: {article_type}")
         
         # Generate keyword
@@ -182,61 +351,85 @@ def main():
         cmd = [
             sys.executable, os.path.join(base_dir, "generate_article.py"),
             "--keyword", keyword,
-            "--type", article_type
+            "--type", article_type,
+            "--source-url", article['url']
         ]
         
         # News/Global articles: Context-based generation (URL reading + summarization)
         if article_type in ["news", "global"]:
             print("\n--- Context-based generation (URL reading + summarization) ---")
             
-            try:
-                # Step 2.5-A: URL reading and summarization
-                article_content = extract_content(article['url'], article['source'])
+            summary_data = prepared["summary_data"]
+            if summary_data:
+                # --- Deduplication Check ---
+                # Decided locally (MinHash/LSH over the whole archive + key-term overlap);
+                # Gemini only confirms borderline candidates
+                candidate_summary = summary_data.get('summary', '')[:500]
                 
-                if article_content['content'] and "Error" not in article_content['title']:
-                    summary_data = summarize_article(article_content['content'], article['title'])
-                    
-                    # --- Deduplication Check ---
-                    # Check against existing WP posts and currently generated articles
-                    candidate_summary = summary_data.get('summary', '')[:500]
-                    
-                    check_against_titles = existing_titles + generated_titles_this_run
-                    
-                    print(f"Checking for duplicates against {len(check_against_titles)} existing items...")
-                    if gemini_client:
-                        is_duplicate = gemini_client.check_duplication(article['title'], candidate_summary, check_against_titles)
-                    else:
-                        is_duplicate = False # fallback
-                    
-                    if is_duplicate:
-                        print(f"⚠️ SKIPPING DUPLICATE: {article['title']}")
-                        print("Reason: Gemini detected this topic covers the same event as an existing or just-generated article.")
-                        continue # Skip to next article
-                    else:
-                        print("✅ Duplication check passed. Proceeding.")
-                        # Add to list for subsequent checks in this run
-                        generated_titles_this_run.append(article['title'])
-                    # ---------------------------
-
-                    # Pass context as JSON string
-                    context_json = json.dumps(summary_data, ensure_ascii=False)
-                    cmd.extend(["--context", context_json])
-                    print(f"Context created: {len(summary_data['summary'])} chars summary, {len(summary_data['key_facts'])} key facts")
+                print(f"Checking for duplicates against {len(dup_index.docs)} indexed items...")
+                is_duplicate, matched_title = check_duplicate(dup_index, article['title'], candidate_summary, gemini_client)
+                
+                if is_duplicate:
+                    print(f"⚠️ SKIPPING DUPLICATE: {article['title']}")
+                    print(f"Reason: Covers the same event as an existing or just-generated article ({matched_title}).")
+                    if ledger is not None and not args.dry_run:
+                        ledger.set_status(article['url'], "duplicate")
+                    continue # Skip to next article
                 else:
-                    print("Warning: Failed to extract content, falling back to keyword-based generation")
-            except Exception as e:
-                print(f"Error during context creation: {e}")
-                print("Falling back to keyword-based generation")
+                    print("✅ Duplication check passed. Proceeding.")
+                    # Add to index for subsequent checks in this run
+                    dup_index.add(f"run:{article['url']}", article['title'], candidate_summary)
+                # ---------------------------
+
+                # Pass context as JSON string
+                context_json = json.dumps(summary_data, ensure_ascii=False)
+                cmd.extend(["--context", context_json])
+                print(f"Context created: {len(summary_data['summary'])} chars summary, {len(summary_data['key_facts'])} key facts")
+            else:
+                print("Warning: Failed to extract content, falling back to keyword-based generation")
         else:
             print("\n--- Keyword-based generation (traditional) ---")
             pass
         
         if args.dry_run:
             cmd.append("--dry-run")
-        
-        subprocess.run(cmd)
+
+        # Second thing shed: the hero image
+        generate_stage = "generate"
+        if not budget.can_afford("generate"):
+            if not budget.can_afford("generate_no_image"):
+                budget.note_shed(f"skipped generation of {args.limit - count} more article(s)")
+                break
+            budget.note_shed(f"generating '{article['title'][:40]}' without a hero image")
+            cmd.append("--no-image")
+            generate_stage = "generate_no_image"
+
+        generate_start = time.monotonic()
+        try:
+            # Hard stop at the deadline so the run still ends cleanly (ledger + state saved)
+            result = subprocess.run(cmd, timeout=budget.remaining() if budget.limited else None)
+            if result.returncode == 0:
+                budget.record(generate_stage, time.monotonic() - generate_start)
+        except subprocess.TimeoutExpired:
+            budget.note_shed(f"generate_article.py for '{article['title'][:40]}' killed at the deadline")
+            if ledger is not None and not args.dry_run and ledger.get_status(article['url']) != "generated":
+                ledger.set_status(article['url'], "failed")
+            break
+
+        # generate_article.py marks the ledger entry as generated once the post exists
+        if ledger is not None and not args.dry_run and ledger.get_status(article['url']) != "generated":
+            ledger.set_status(article['url'], "failed")
+
         count += 1
         print("-" * 40)
 
+    if speculative is not None:
+        print(f"Speculative prep: {speculative.started} started, {speculative.cancelled} cancelled before starting, "
+              f"{speculative.wasted} discarded after starting.")
+        speculative.shutdown()
+
+    budget.report()
+    budget.save()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Per-Host Politeness Scheduler for LogiShift
+
+Shared by the feed collector and the article extractor. Requests to different
+hosts run in parallel; requests to the same host are limited to a few at a time
+and spaced by a minimum interval, so raising total concurrency never hammers
+a single publisher.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+MAX_PER_HOST = 2  # Concurrent requests per host
+MIN_INTERVAL = 1.0  # Seconds between request starts on the same host
+MAX_RETRY_AFTER = 60  # Cap for a server-requested back-off (seconds)
+
+
+def _host(url):
+    return urlsplit(url).netloc.lower().split("@")[-1]
+
+
+def _retry_after_seconds(value):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds, or None."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HostScheduler:
+    """
+    Per-host concurrency + minimum-interval limiter. Safe to share between threads.
+
+    Args:
+        max_per_host: Concurrent requests allowed per host
+        min_interval: Minimum seconds between two request starts on the same host
+        overrides: Optional {host: {"max_per_host": int, "min_interval": float}}
+    """
+
+    def __init__(self, max_per_host=MAX_PER_HOST, min_interval=MIN_INTERVAL, overrides=None):
+        self.max_per_host = max_per_host
+        self.min_interval = min_interval
+        self.overrides = overrides or {}
+        self._lock = threading.Lock()
+        self._slots = {}  # host -> BoundedSemaphore
+        self._next_start = {}  # host -> monotonic time of the next allowed start
+
+    def _limits(self, host):
+        override = self.overrides.get(host, {})
+        return (override.get("max_per_host", self.max_per_host),
+                override.get("min_interval", self.min_interval))
+
+    @contextmanager
+    def slot(self, url):
+        """Hold one of the host's request slots, waiting for its turn first."""
+        host = _host(url)
+        max_per_host, min_interval = self._limits(host)
+        with self._lock:
+            semaphore = self._slots.get(host)
+            if semaphore is None:
+                semaphore = self._slots[host] = threading.BoundedSemaphore(max(1, max_per_host))
+
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+    def back_off(self, url, seconds):
+        """Delay the next request to a host (e.g. after a 429 with Retry-After)."""
+        host = _host(url)
+        seconds = min(seconds, MAX_RETRY_AFTER)
+        with self._lock:
+            until = time.monotonic() + seconds
+            self._next_start[host] = max(self._next_start.get(host, 0), until)
+
+    def get(self, url, **kwargs):
+        """requests.get() inside the host's slot. Honors Retry-After on 429/503 for later requests."""
+        with self.slot(url):
+            response = requests.get(url, **kwargs)
+        if response.status_code in (429, 503):
+            delay = _retry_after_seconds(response.headers.get("Retry-After"))
+            if delay:
+                print(f"Politeness: {_host(url)} asked to back off for {delay:.0f}s")
+                self.back_off(url, delay)
+        return response
+
+
+# Process-wide scheduler shared by collector.py and url_reader.py
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the shared HostScheduler (created on first use)."""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = HostScheduler()
+        return _default_scheduler
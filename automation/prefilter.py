@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Local Relevance Pre-Filter for LogiShift
+
+A hashed-feature logistic regression trained on our own historical Gemini
+scores (article ledger or scorer.py output). It rates a collected article in
+microseconds, so clearly off-topic items (consumer tech, funding rounds, ...)
+can be dropped before they cost a scoring call.
+
+The decision cutoff is calibrated on held-out articles to keep a target share
+of the articles Gemini would have passed (recall), never keeping less than a
+minimum fraction of the input.
+
+Usage:
+    python prefilter.py --train --threshold 75      # train from the ledger and print the report
+    python prefilter.py --report                    # evaluate the saved model
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+from datetime import datetime
+
+try:
+    from automation.ledger import ArticleLedger
+except ImportError:
+    from ledger import ArticleLedger
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+DEFAULT_MODEL_PATH = os.path.join(CACHE_DIR, "prefilter_model.json")
+
+NUM_FEATURES = 1 << 18
+TARGET_RECALL = 0.95  # Share of would-pass articles the cutoff must keep (on held-out data)
+MIN_KEEP_FRACTION = 0.3  # Never drop more than 70% of the input
+MIN_TRAINING_SAMPLES = 200
+MIN_POSITIVES = 10
+HOLDOUT_SHARE = 0.2
+MAX_MODEL_AGE_DAYS = 7
+AUDIT_RATE = 0.05  # Share of dropped articles still sent to Gemini to measure live recall
+
+_CJK = re.compile(r'[\u3040-\u30ff\u4e00-\u9fff]')
+
+
+def _hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little") % NUM_FEATURES
+
+
+def featurize(article):
+    """Hashed features: title/summary unigrams + bigrams (CJK character bigrams), title words and source."""
+    title = article.get("title") or ""
+    summary = re.sub(r'<[^<]+?>', ' ', article.get("summary") or "")[:2000]
+
+    tokens = []
+    for field, text in (("t", title), ("s", summary)):
+        words = re.findall(r'\w+', text.casefold())
+        latin = [w for w in words if not _CJK.search(w)]
+        tokens += [f"w:{w}" for w in latin]
+        tokens += [f"b:{a}_{b}" for a, b in zip(latin, latin[1:])]
+        for word in words:
+            if _CJK.search(word):
+                tokens += [f"c:{word[i:i + 2]}" for i in range(max(1, len(word) - 1))]
+        if field == "t":
+            tokens += [f"tw:{w}" for w in latin]
+    tokens.append(f"src:{article.get('source', '')}")
+
+    features = {}
+    for token in tokens:
+        index = _hash(token)
+        features[index] = features.get(index, 0.0) + 1.0
+    # L2-normalize so long summaries do not dominate
+    norm = math.sqrt(sum(v * v for v in features.values())) or 1.0
+    return {k: v / norm for k, v in features.items()}
+
+
+def _sigmoid(z):
+    if z < -35:
+        return 0.0
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+class PrefilterModel:
+    """Sparse logistic regression over hashed features, persisted as JSON."""
+
+    def __init__(self, weights=None, bias=0.0, cutoff=0.0, label_threshold=None, metrics=None, trained_at=None):
+        self.weights = weights or {}
+        self.bias = bias
+        self.cutoff = cutoff
+        self.label_threshold = label_threshold
+        self.metrics = metrics or {}
+        self.trained_at = trained_at
+
+    def predict(self, article):
+        """Probability that Gemini would score the article at or above label_threshold."""
+        return self._predict_features(featurize(article))
+
+    def keep(self, article):
+        """True if the article should still go to Gemini."""
+        return self.predict(article) >= self.cutoff
+
+    @classmethod
+    def train(cls, samples, label_threshold, epochs=8, learning_rate=0.5, l2=1e-5, seed=42):
+        """
+        Train on [(article, llm_score)] and calibrate the cutoff on a held-out split.
+        Returns None if there is not enough history to train on.
+        """
+        data = [(featurize(a), 1 if score >= label_threshold else 0, a) for a, score in samples]
+        positives = sum(label for _, label, _ in data)
+        if len(data) < MIN_TRAINING_SAMPLES or positives < MIN_POSITIVES:
+            print(f"Prefilter: not enough history to train ({len(data)} samples, {positives} positives).")
+            return None
+
+        # Deterministic split by title so re-training reports are comparable
+        def in_holdout(article):
+            digest = hashlib.sha1((article.get("title") or "").encode("utf-8")).digest()
+            return digest[0] < 256 * HOLDOUT_SHARE
+        train = [(x, y) for x, y, a in data if not in_holdout(a)]
+        holdout = [(x, y) for x, y, a in data if in_holdout(a)]
+
+        # Positives are rare: weight them so both classes contribute equally
+        train_pos = sum(y for _, y in train) or 1
+        pos_weight = (len(train) - train_pos) / train_pos
+
+        weights, bias = {}, 0.0
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(train)
+            rate = learning_rate / (1 + epoch)
+            for x, y in train:
+                z = bias + sum(weights.get(k, 0.0) * v for k, v in x.items())
+                gradient = (_sigmoid(z) - y) * (pos_weight if y else 1.0)
+                bias -= rate * gradient
+                for k, v in x.items():
+                    w = weights.get(k, 0.0)
+                    weights[k] = w - rate * (gradient * v + l2 * w)
+
+        model = cls(weights={k: w for k, w in weights.items() if abs(w) > 1e-6}, bias=bias,
+                    label_threshold=label_threshold, trained_at=datetime.now().isoformat())
+        model.cutoff = model._calibrate(holdout or [(x, y) for x, y, _ in data])
+        model.metrics = model.evaluate_features(holdout or [(x, y) for x, y, _ in data])
+        model.metrics["training_samples"] = len(train)
+        return model
+
+    def _calibrate(self, labelled):
+        """Highest cutoff that keeps TARGET_RECALL of positives and at least MIN_KEEP_FRACTION overall."""
+        probs = sorted((self._predict_features(x), y) for x, y in labelled)
+        pos_probs = [p for p, y in probs if y]
+        if not pos_probs:
+            return 0.0
+        recall_cutoff = pos_probs[int(math.floor((1 - TARGET_RECALL) * len(pos_probs)))]
+        keep_cutoff = probs[int(math.floor((1 - MIN_KEEP_FRACTION) * (len(probs) - 1)))][0]
+        return min(recall_cutoff, keep_cutoff)
+
+    def _predict_features(self, x):
+        return _sigmoid(self.bias + sum(self.weights.get(k, 0.0) * v for k, v in x.items()))
+
+    def evaluate_features(self, labelled):
+        kept = [y for x, y in labelled if self._predict_features(x) >= self.cutoff]
+        positives = sum(y for _, y in labelled)
+        return {
+            "holdout_samples": len(labelled),
+            "holdout_positives": positives,
+            "kept_fraction": len(kept) / len(labelled) if labelled else 1.0,
+            "recall": sum(kept) / positives if positives else 1.0,
+        }
+
+    def evaluate(self, samples):
+        """Recall / kept fraction against LLM scores for [(article, llm_score)]."""
+        return self.evaluate_features([(featurize(a), 1 if s >= self.label_threshold else 0) for a, s in samples])
+
+    def is_stale(self, label_threshold, max_age_days=MAX_MODEL_AGE_DAYS):
+        if self.label_threshold != label_threshold or not self.trained_at:
+            return True
+        return (datetime.now() - datetime.fromisoformat(self.trained_at)).days >= max_age_days
+
+    def save(self, path=DEFAULT_MODEL_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "num_features": NUM_FEATURES,
+                "weights": self.weights,
+                "bias": self.bias,
+                "cutoff": self.cutoff,
+                "label_threshold": self.label_threshold,
+                "metrics": self.metrics,
+                "trained_at": self.trained_at
+            }, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_MODEL_PATH):
+        """Load a saved model, or None if missing / incompatible."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Warning: Failed to load prefilter model ({e}).")
+            return None
+        if data.get("num_features") != NUM_FEATURES:
+            return None
+        return cls(weights={int(k): w for k, w in data["weights"].items()}, bias=data["bias"],
+                   cutoff=data["cutoff"], label_threshold=data["label_threshold"],
+                   metrics=data.get("metrics"), trained_at=data.get("trained_at"))
+
+
+def samples_from_json(path):
+    """[(article, score)] from scorer.py --output files."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    articles = data.get("articles", []) if isinstance(data, dict) else data
+    return [(a, a["score"]) for a in articles if a.get("relevance") != "error" and "score" in a]
+
+
+def load_or_train(ledger, label_threshold, path=DEFAULT_MODEL_PATH):
+    """Return a fresh-enough model for the threshold, re-training from the ledger when stale."""
+    model = PrefilterModel.load(path)
+    if model is not None and not model.is_stale(label_threshold):
+        return model
+    model = PrefilterModel.train(ledger.get_scored_history(), label_threshold)
+    if model is not None:
+        model.save(path)
+        print_report(model)
+    return model
+
+
+def print_report(model):
+    m = model.metrics
+    print(f"Prefilter model (label >= {model.label_threshold}, cutoff {model.cutoff:.3f}, trained {model.trained_at}):")
+    print(f"  Held-out: {m.get('holdout_samples')} articles, {m.get('holdout_positives')} would pass Gemini")
+    print(f"  Keeps {m.get('kept_fraction', 1) * 100:.1f}% of articles, recall {m.get('recall', 1) * 100:.1f}% "
+          f"(~{(1 - m.get('kept_fraction', 1)) * 100:.0f}% fewer scoring calls)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train / evaluate the local relevance pre-filter.")
+    parser.add_argument("--train", action="store_true", help="Train from scored history and save the model")
+    parser.add_argument("--report", action="store_true", help="Print the saved model's held-out report")
+    parser.add_argument("--threshold", type=int, default=70, help="LLM score that counts as relevant (default: 70)")
+    parser.add_argument("--from-json", type=str, action="append", help="Train on scorer.py --output files instead of the ledger (repeatable)")
+    args = parser.parse_args()
+
+    if args.train:
+        if args.from_json:
+            samples = [s for path in args.from_json for s in samples_from_json(path)]
+        else:
+            samples = ArticleLedger().get_scored_history()
+        model = PrefilterModel.train(samples, args.threshold)
+        if model is None:
+            sys.exit(1)
+        model.save()
+        print_report(model)
+    elif args.report:
+        model = PrefilterModel.load()
+        if model is None:
+            print("No prefilter model saved yet (run with --train).")
+            sys.exit(1)
+        print_report(model)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Prompt Compaction for LogiShift
+
+Shared pre-processing for text that goes into Gemini prompts (RSS summaries,
+scraped articles, WordPress post bodies). Strips markup, drops feed/site
+boilerplate, folds whitespace, removes repeated paragraphs and cuts the
+result to a token budget at a paragraph or sentence boundary.
+"""
+
+import html
+import re
+
+try:
+    from automation.token_estimator import estimate_tokens
+except ImportError:
+    from token_estimator import estimate_tokens
+
+# Per-call budgets (estimated tokens) used by the prompt builders
+SCORING_SUMMARY_TOKENS = 300  # One RSS summary in the batch scoring prompt
+CLASSIFIER_SUMMARY_TOKENS = 400
+SUMMARIZER_CONTENT_TOKENS = 6000  # Full article for summarize_article
+LINKER_CANDIDATE_TOKENS = 120  # One internal-link candidate
+LINKER_CONTEXT_TOKENS = 150  # New article outline in the linker prompt
+WEEKLY_CONTEXT_TOKENS = 12000  # All posts of the weekly summary together
+
+TRUNCATION_MARK = " …"
+COMPACTION_VERSION = 2  # Bump whenever compact() output changes; part of the scorer's prompt version
+
+# Whole lines that carry no content (feed footers, share widgets, cookie banners)
+BOILERPLATE_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r'^the post .{0,200} appeared first on .{0,100}\.?$',
+    r'^(continue|keep) reading\b.{0,80}$',
+    r'^read (more|the full (story|article))\b.{0,80}$',
+    r'^(share|share this|share on)\s*(:|on|this).{0,80}$',
+    r'^(subscribe|sign up)\b.{0,120}(newsletter|updates|inbox).{0,60}$',
+    r'^(advertisement|sponsored|related( articles| posts)?:?)$',
+    r'^(this (site|website) uses cookies|we use cookies)\b.{0,200}$',
+    r'^click here\b.{0,80}$',
+    r'^(photo|image) (credit|courtesy)\b.{0,120}$',
+)]
+
+_BLOCK_TAGS = re.compile(r'<\s*(br|/p|/div|/li|/h[1-6]|/tr|/blockquote)\b[^>]*>', re.IGNORECASE)
+_DROP_BLOCKS = re.compile(r'<(script|style|noscript|iframe|svg)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+# Latin stops only count before whitespace / end of text, so decimals ("3.5") and domains stay whole
+_SENTENCE_END = re.compile(r'(?<=[\u3002\uff01\uff1f])\s*|(?<=[.!?])(?:\s+|$)')
+
+
+def strip_markup(text):
+    """HTML to plain text: drops scripts/styles/comments and tags, keeps block breaks, unescapes entities."""
+    text = _DROP_BLOCKS.sub(' ', text)
+    text = re.sub(r'<!--.*?-->', ' ', text, flags=re.DOTALL)
+    text = _BLOCK_TAGS.sub('\n', text)
+    text = re.sub(r'<[^<]+?>', ' ', text)
+    return html.unescape(text)
+
+
+def fold_whitespace(text):
+    """Collapse runs of spaces inside lines and blank lines between paragraphs."""
+    lines = [" ".join(line.split()) for line in text.splitlines()]
+    return "\n".join(line for line in lines if line)
+
+
+def drop_boilerplate(text):
+    """Remove lines that match BOILERPLATE_PATTERNS."""
+    return "\n".join(line for line in text.splitlines()
+                     if not any(p.match(line.strip()) for p in BOILERPLATE_PATTERNS))
+
+
+def dedupe_paragraphs(text):
+    """Drop paragraphs repeated verbatim (ignoring case / punctuation), keeping the first."""
+    seen = set()
+    kept = []
+    for paragraph in text.splitlines():
+        key = re.sub(r'[^\w]+', '', paragraph.casefold())
+        if key and key in seen:
+            continue
+        seen.add(key)
+        kept.append(paragraph)
+    return "\n".join(kept)
+
+
+def truncate_to_budget(text, max_tokens):
+    """Cut text to about max_tokens, preferring paragraph, then sentence boundaries."""
+    if max_tokens is None or estimate_tokens(text) <= max_tokens:
+        return text
+
+    kept = []
+    used = 0
+    for paragraph in text.splitlines():
+        cost = estimate_tokens(paragraph + "\n")
+        if used + cost <= max_tokens:
+            kept.append(paragraph)
+            used += cost
+            continue
+        # Fill the remaining budget with whole sentences of this paragraph
+        partial = ""
+        for sentence in _SENTENCE_END.split(paragraph):
+            if not sentence or estimate_tokens(partial + sentence) + used > max_tokens:
+                break
+            partial += sentence + " "
+        if partial.strip():
+            kept.append(partial.strip())
+        elif not kept:
+            # Single giant unbroken paragraph: hard cut by characters
+            kept.append(paragraph[:max(1, len(paragraph) * max_tokens // estimate_tokens(paragraph))])
+        break
+    return "\n".join(kept) + TRUNCATION_MARK
+
+
+def compact(text, max_tokens=None):
+    """
+    Full compaction pipeline for prompt input.
+
+    Args:
+        text: Raw text or HTML
+        max_tokens: Optional estimated-token budget for the result
+    """
+    if not text:
+        return ""
+    text = strip_markup(str(text))
+    text = fold_whitespace(text)
+    text = drop_boilerplate(text)
+    text = dedupe_paragraphs(text)
+    return truncate_to_budget(text, max_tokens)
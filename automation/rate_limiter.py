@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Gemini Rate Limiter for LogiShift
+
+Proactive per-model quota metering, shared by every GeminiClient in the
+process. Each model has two token buckets: requests per minute and tokens per
+minute. A call reserves one request and its estimated tokens before it goes
+out and waits for its turn if the buckets are empty, so concurrent workers are
+spaced out instead of all hitting 429 together. Token estimates are corrected
+with the actual usage reported in the response.
+
+Limits per model come from MODEL_LIMITS, overridable with GEMINI_RATE_LIMITS:
+    GEMINI_RATE_LIMITS="gemini-3-flash-preview=1000/1000000,gemini-3-pro-preview=25/1000000"
+    GEMINI_RATE_LIMITS=off    # disable metering
+"""
+
+import os
+import threading
+import time
+
+try:
+    from automation.token_estimator import estimate_tokens
+except ImportError:
+    from token_estimator import estimate_tokens
+
+DEFAULT_RPM = 60
+DEFAULT_TPM = 1000000
+# (requests/min, tokens/min) per model; set these to the project's quota tier
+MODEL_LIMITS = {
+    "gemini-3-pro-preview": (25, 1000000),
+    "gemini-3-flash-preview": (1000, 1000000),
+    "gemini-2.0-flash-exp": (10, 250000),
+    "imagen-3.0-generate-001": (20, DEFAULT_TPM),
+}
+OUTPUT_TOKEN_ALLOWANCE = 512  # Added to the prompt estimate until the real usage is known
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at rate_per_minute, holding at most one minute's worth.
+
+    Reservations are taken immediately (the balance may go negative) and each caller
+    waits for its own share to refill, so waiters are served in arrival order.
+    """
+
+    def __init__(self, rate_per_minute):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount):
+        """Take `amount` tokens (capped at capacity). Returns the seconds to wait before using them."""
+        with self._lock:
+            self._refill()
+            self._tokens -= min(float(amount), self.capacity)
+            return max(0.0, -self._tokens / self.rate)
+
+    def adjust(self, delta):
+        """Take (positive) or return (negative) tokens after the fact, without waiting."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - delta)
+
+    def drain(self, seconds):
+        """Empty the bucket so that nothing is granted for the next `seconds`."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class RateLimiter:
+    """
+    Per-model RPM + TPM buckets. Safe to share between threads.
+
+    Args:
+        limits: {model: (rpm, tpm)}; models not listed get (default_rpm, default_tpm)
+    """
+
+    def __init__(self, limits=None, default_rpm=DEFAULT_RPM, default_tpm=DEFAULT_TPM):
+        self.limits = dict(MODEL_LIMITS if limits is None else limits)
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self._lock = threading.Lock()
+        self._buckets = {}  # model -> (rpm bucket, tpm bucket)
+        self.waited = 0.0  # Total seconds callers spent waiting for quota
+
+    def _model_buckets(self, model):
+        with self._lock:
+            buckets = self._buckets.get(model)
+            if buckets is None:
+                rpm, tpm = self.limits.get(model, (self.default_rpm, self.default_tpm))
+                buckets = self._buckets[model] = (TokenBucket(rpm), TokenBucket(tpm))
+            return buckets
+
+    def reserve(self, model, tokens):
+        """Reserve one request and `tokens` for the model. Returns the seconds to wait before sending."""
+        requests_bucket, tokens_bucket = self._model_buckets(model)
+        wait = max(requests_bucket.reserve(1), tokens_bucket.reserve(tokens))
+        if wait > 0:
+            with self._lock:
+                self.waited += wait
+        return wait
+
+    def acquire(self, model, tokens):
+        """reserve(), then sleep until the reservation is due (blocking callers)."""
+        wait = self.reserve(model, tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def settle(self, model, estimated, actual):
+        """Correct a reservation once the response reports the real token usage."""
+        if actual:
+            self._model_buckets(model)[1].adjust(actual - estimated)
+
+    def back_off(self, model, seconds):
+        """After a 429: hold every caller of this model for `seconds` instead of letting each retry."""
+        self._model_buckets(model)[0].drain(seconds)
+
+
+def estimate_request_tokens(contents):
+    """Estimated tokens a request will count against TPM (prompt + output allowance)."""
+    text = contents if isinstance(contents, str) else str(contents or "")
+    return estimate_tokens(text) + OUTPUT_TOKEN_ALLOWANCE
+
+
+def usage_tokens(response):
+    """Total tokens reported by a genai response, or None."""
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) if usage is not None else None
+
+
+def _limits_from_env():
+    """Parse GEMINI_RATE_LIMITS into {model: (rpm, tpm)} merged over MODEL_LIMITS (None = disabled)."""
+    value = os.getenv("GEMINI_RATE_LIMITS", "").strip()
+    limits = dict(MODEL_LIMITS)
+    if value.lower() in ("off", "0", "false"):
+        return None
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        try:
+            model, quota = item.split("=", 1)
+            rpm, tpm = quota.split("/", 1)
+            limits[model.strip()] = (int(rpm), int(tpm))
+        except ValueError:
+            print(f"Warning: Ignoring malformed GEMINI_RATE_LIMITS entry: {item}")
+    return limits
+
+
+_default_limiter = None
+_default_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Return the shared RateLimiter (created on first use), or None if disabled via GEMINI_RATE_LIMITS=off."""
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            limits = _limits_from_env()
+            if limits is None:
+                return None
+            _default_limiter = RateLimiter(limits)
+        return _default_limiter
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Archive Re-Scoring for LogiShift
+
+Re-scores historical articles under a candidate rubric (a replacement for
+scorer.SCORING_CONTEXT) and reports how the ranking shifts against the scores
+they originally received.
+
+Articles are streamed from scorer.py --output / collector files or from the
+article ledger and scored in concurrent token-packed batches. Every result is
+appended to the output JSONL as soon as its batch lands. A resumed run skips
+articles (by URL) that already have a result there and retries the ones that
+failed; the latest line per article wins. Scores are cached under the prompt
+version, so re-running with an unchanged rubric costs no Gemini calls.
+
+Usage:
+    python rescore_archive.py --from-ledger --context-file rubric_v2.txt --output rescored_v2.jsonl
+    python rescore_archive.py --input scored_2025.json --context-file rubric_v2.txt --output rescored_v2.jsonl
+    python rescore_archive.py --report-only --output rescored_v2.jsonl
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+
+try:
+    from automation.gemini_client import get_shared_client
+    from automation.disk_cache import make_key
+    from automation.ledger import ArticleLedger
+    from automation.scorer import (iter_articles, iter_token_batches, score_batches, open_score_cache,
+                                   prompt_version, BATCH_TOKEN_BUDGET)
+except ImportError:
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from automation.gemini_client import get_shared_client
+    from automation.disk_cache import make_key
+    from automation.ledger import ArticleLedger
+    from automation.scorer import (iter_articles, iter_token_batches, score_batches, open_score_cache,
+                                   prompt_version, BATCH_TOKEN_BUDGET)
+
+RESCORE_CONCURRENCY = 8  # Bulk jobs can run wider than the daily pipeline
+TOP_K = 50  # Size of the "front page" compared between rubrics
+MOVERS_SHOWN = 10
+
+
+def iter_history(input_paths=None, ledger=None, limit=None):
+    """
+    Yield historical articles with their original score in "previous_score".
+
+    Reads scorer.py --output / collector files (JSON or JSONL) in order, or the
+    ledger's scored history (in insertion order, which pipeline runs between
+    resumes do not change). Items without a usable score are still re-scored but
+    left out of the shift report.
+    """
+    def from_files():
+        for path in input_paths:
+            for article in _iter_file(path):
+                if article.get("relevance") == "error":
+                    article = dict(article, score=None)
+                yield article
+
+    if ledger is not None:
+        articles = (dict(article, score=score) for article, score in ledger.get_scored_history(oldest_first=True))
+    else:
+        articles = from_files()
+
+    for article in itertools.islice(articles, limit):
+        yield {
+            "title": article.get("title"),
+            "url": article.get("url"),
+            "source": article.get("source"),
+            "summary": article.get("summary", ""),
+            "previous_score": article.get("score")
+        }
+
+
+def _iter_file(path):
+    """Articles of a scorer.py --output document ({"articles": [...]}) or any iter_articles() input."""
+    if path != "-":
+        with open(path, 'r', encoding='utf-8') as f:
+            first = f.readline().strip()
+        if first == "{":
+            # Pretty-printed scorer.py --output: not streamable, load it whole
+            with open(path, 'r', encoding='utf-8') as f:
+                yield from json.load(f).get("articles", [])
+            return
+    yield from iter_articles(path)
+
+
+def result_key(article):
+    """Checkpoint key of an article: its URL, or a hash of its content if it has none."""
+    return article.get("url") or make_key(article.get("title"), article.get("summary", ""), article.get("source"))
+
+
+def load_checkpoint(output_path):
+    """Latest result per article in the checkpoint file ({key: result}); later lines supersede earlier ones."""
+    latest = {}
+    if os.path.exists(output_path):
+        for result in iter_articles(output_path):
+            latest[result_key(result)] = result
+    return latest
+
+
+def _ranks(values):
+    """1-based ranks, ties sharing the average rank."""
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    ranks = [0.0] * len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2.0 + 1
+        i = j + 1
+    return ranks
+
+
+def spearman(xs, ys):
+    """Spearman rank correlation (None if undefined)."""
+    if len(xs) < 2:
+        return None
+    rx, ry = _ranks(xs), _ranks(ys)
+    mean_x, mean_y = sum(rx) / len(rx), sum(ry) / len(ry)
+    cov = sum((a - mean_x) * (b - mean_y) for a, b in zip(rx, ry))
+    var_x = sum((a - mean_x) ** 2 for a in rx)
+    var_y = sum((b - mean_y) ** 2 for b in ry)
+    if not var_x or not var_y:
+        return None
+    return cov / (var_x * var_y) ** 0.5
+
+
+def shift_report(results, threshold, top_k=TOP_K):
+    """Compare previous_score and score over results that have both (errors excluded)."""
+    pairs = [r for r in results
+             if r.get("previous_score") is not None and r.get("relevance") != "error"]
+    if not pairs:
+        return {"compared": 0}
+
+    old = [r["previous_score"] for r in pairs]
+    new = [r["score"] for r in pairs]
+    k = min(top_k, len(pairs))
+    # Ties are broken by position so the overlap does not depend on set ordering
+    top_old = set(sorted(range(len(pairs)), key=lambda i: (-old[i], i))[:k])
+    top_new = set(sorted(range(len(pairs)), key=lambda i: (-new[i], i))[:k])
+    movers = sorted(pairs, key=lambda r: abs(r["score"] - r["previous_score"]), reverse=True)
+
+    return {
+        "compared": len(pairs),
+        "spearman": spearman(old, new),
+        "top_k": k,
+        "top_k_overlap": len(top_old & top_new) / k,
+        "mean_shift": sum(n - o for o, n in zip(old, new)) / len(pairs),
+        "newly_passing": sum(1 for o, n in zip(old, new) if o < threshold <= n),
+        "newly_failing": sum(1 for o, n in zip(old, new) if n < threshold <= o),
+        "passing_before": sum(1 for o in old if o >= threshold),
+        "passing_after": sum(1 for n in new if n >= threshold),
+        "movers": [{"title": r.get("title"), "url": r.get("url"),
+                    "previous_score": r["previous_score"], "score": r["score"]}
+                   for r in movers[:MOVERS_SHOWN]]
+    }
+
+
+def print_report(report, threshold):
+    if not report.get("compared"):
+        print("No articles with both a previous and a new score to compare.")
+        return
+    rho = report["spearman"]
+    print(f"Rank shift over {report['compared']} articles:")
+    print(f"  Spearman rank correlation: {rho:.3f}" if rho is not None else "  Spearman rank correlation: n/a")
+    print(f"  Top-{report['top_k']} overlap: {report['top_k_overlap'] * 100:.1f}%")
+    print(f"  Mean score shift: {report['mean_shift']:+.1f}")
+    print(f"  Passing >= {threshold}: {report['passing_before']} -> {report['passing_after']} "
+          f"(+{report['newly_passing']} / -{report['newly_failing']})")
+    print("  Biggest movers:")
+    for m in report["movers"]:
+        print(f"    {m['previous_score']:>3} -> {m['score']:>3}  {(m.get('title') or 'Unknown')[:70]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score the article archive under a candidate rubric and report the rank shift.")
+    parser.add_argument("--input", type=str, action="append", help="scorer.py --output or collector JSON/JSONL file (repeatable)")
+    parser.add_argument("--from-ledger", action="store_true", help="Re-score the ledger's scored history instead of files")
+    parser.add_argument("--context-file", type=str, help="Text file with the candidate rubric replacing SCORING_CONTEXT (default: current rubric)")
+    parser.add_argument("--output", type=str, required=True, help="Results JSONL; also the checkpoint for resuming")
+    parser.add_argument("--limit", type=int, help="Re-score at most N articles")
+    parser.add_argument("--threshold", type=int, default=80, help="Pass threshold for the flip counts (default: 80)")
+    parser.add_argument("--top-k", type=int, default=TOP_K, help=f"Top-K overlap size (default: {TOP_K})")
+    parser.add_argument("--model", type=str, default="gemini-3-flash-preview", help="Gemini model to use")
+    parser.add_argument("--concurrency", type=int, default=RESCORE_CONCURRENCY, help=f"Batches scored in parallel (default: {RESCORE_CONCURRENCY})")
+    parser.add_argument("--batch-token-budget", type=int, default=BATCH_TOKEN_BUDGET, help=f"Estimated article tokens per scoring request (default: {BATCH_TOKEN_BUDGET})")
+    parser.add_argument("--no-cache", action="store_true", help="Do not reuse or store scores in the persistent score cache")
+    parser.add_argument("--restart", action="store_true", help="Discard the existing output instead of resuming from it")
+    parser.add_argument("--report-only", action="store_true", help="Only print the shift report for an existing output")
+    args = parser.parse_args()
+
+    if not args.report_only and not args.input and not args.from_ledger:
+        parser.error("one of --input or --from-ledger is required")
+
+    scoring_context = None
+    if args.context_file:
+        with open(args.context_file, 'r', encoding='utf-8') as f:
+            scoring_context = f.read()
+
+    if not args.report_only:
+        if args.restart and os.path.exists(args.output):
+            os.remove(args.output)
+        checkpoint = load_checkpoint(args.output)
+        done = {key for key, res in checkpoint.items() if res.get("relevance") != "error"}
+        retried = len(checkpoint) - len(done)
+
+        try:
+            client = get_shared_client()
+        except Exception as e:
+            print(f"Fatal Error: Failed to initialize GeminiClient: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        history = iter_history(args.input, ArticleLedger() if args.from_ledger else None, args.limit)
+        remaining = (article for article in history if result_key(article) not in done)
+        cache = None if args.no_cache else open_score_cache()
+
+        print(f"Re-scoring archive with prompt version {prompt_version(scoring_context)} "
+              f"(Concurrency: {args.concurrency}, {len(done)} already done, {retried} failed earlier to retry)...")
+        written = 0
+        with open(args.output, 'a', encoding='utf-8') as out:
+            batches = iter_token_batches(remaining, token_budget=args.batch_token_budget)
+            for start_id, batch, results in score_batches(client, batches, model_name=args.model,
+                                                          max_in_flight=args.concurrency, cache=cache,
+                                                          scoring_context=scoring_context):
+                if len(results) != len(batch):
+                    print(f"Batch at {start_id} failed; its {len(batch)} article(s) are retried on the next run.",
+                          file=sys.stderr)
+                    continue
+                for article, res in zip(batch, results):
+                    out.write(json.dumps(dict(res, previous_score=article["previous_score"]), ensure_ascii=False) + "\n")
+                out.flush()
+                written += len(batch)
+                print(f"[{len(done) + written}] re-scored.")
+        print(f"Re-scored {written} article(s) this run (results in {args.output}).")
+
+    results = list(load_checkpoint(args.output).values())
+    print_report(shift_report(results, args.threshold, args.top_k), args.threshold)
+
+
+if __name__ == "__main__":
+    main()
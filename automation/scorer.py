@@ -9,17 +9,38 @@ Evaluates articles using Gemini API based on LogiShift's editorial persona:
 """
 
 import argparse
+import hashlib
+import itertools
 import json
 import os
+import queue
+import re
 import sys
-from dotenv import load_dotenv
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 try:
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_shared_client
+    from automation.ledger import ArticleLedger
+    from automation.disk_cache import DiskCache, make_key
+    from automation.token_estimator import estimate_tokens
+    from automation.prompt_compactor import compact, SCORING_SUMMARY_TOKENS, COMPACTION_VERSION
 except ImportError:
     import sys
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_shared_client
+    from automation.ledger import ArticleLedger
+    from automation.disk_cache import DiskCache, make_key
+    from automation.token_estimator import estimate_tokens
+    from automation.prompt_compactor import compact, SCORING_SUMMARY_TOKENS, COMPACTION_VERSION
+
+SCORING_CONCURRENCY = 4  # Batches scored in parallel (each batch is one Gemini call)
+BATCH_TOKEN_BUDGET = 4000  # Estimated article tokens per scoring request (prompt overhead not included)
+MAX_BATCH_ITEMS = 25  # Cap so the JSON answer stays short even for one-line summaries
+SCORE_CACHE_TTL = 7 * 24 * 3600  # Seconds a cached score stays valid
+SCORE_CACHE_MAX_ENTRIES = 20000
 
 # Editorial Persona and Scoring Criteria (Shared Context)
 SCORING_CONTEXT = """You are the "Editor-in-Chief" of LogiShift Global, a logistics DX media.
@@ -51,7 +72,8 @@ Evaluate whether the following article is beneficial for our target audience: "L
    - Does it feature major players or significant shifts?
 """
 
-BATCH_SCORING_PROMPT = SCORING_CONTEXT + """
+# Rubric-independent part of each prompt; the rubric (scoring_context) is prepended at call time
+BATCH_SCORING_INSTRUCTIONS = """
 【Instructions】
 You will be provided with a list of articles.
 For EACH article, provide a score (0-100), reasoning, and relevance assessment.
@@ -71,8 +93,28 @@ Output ONLY a JSON Array containing an object for each article in the same order
     ...
 ]
 """
+BATCH_SCORING_PROMPT = SCORING_CONTEXT + BATCH_SCORING_INSTRUCTIONS
+
+# Structured output: Gemini must answer with exactly this array shape
+BATCH_SCORING_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "id": {"type": "INTEGER"},
+            "score": {"type": "INTEGER"},
+            "reasoning": {"type": "STRING"},
+            "relevance": {"type": "STRING", "enum": ["high", "medium", "low"]}
+        },
+        "required": ["id", "score", "reasoning", "relevance"]
+    }
+}
+BATCH_SCORING_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": BATCH_SCORING_SCHEMA
+}
 
-SINGLE_SCORING_PROMPT = SCORING_CONTEXT + """
+SINGLE_SCORING_INSTRUCTIONS = """
 【Article Info】
 Title: {title}
 Summary: {summary}
@@ -86,91 +128,325 @@ Output ONLY the following JSON format:
   "relevance": "<high/medium/low>"
 }}
 """
+SINGLE_SCORING_PROMPT = SCORING_CONTEXT + SINGLE_SCORING_INSTRUCTIONS
+
+# How the request is laid out: rubric, instructions and articles in one user prompt
+PROMPT_LAYOUT = "single-prompt"
 
-def score_articles_batch(client, articles, start_id, model_name="gemini-3-flash-preview"):
+def prompt_version(scoring_context=None):
+    """
+    Short hash of everything that shapes a scoring request built with the given rubric
+    (default: SCORING_CONTEXT): prompt texts, their layout, the response schema and
+    how article summaries are compacted.
+    """
+    material = [PROMPT_LAYOUT, scoring_context or SCORING_CONTEXT, BATCH_SCORING_INSTRUCTIONS,
+                SINGLE_SCORING_INSTRUCTIONS, BATCH_SCORING_CONFIG, SCORING_SUMMARY_TOKENS, COMPACTION_VERSION]
+    blob = json.dumps(material, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:12]
+
+# Any change to the prompts, schema or compaction changes this version, so cached scores from the old request shape are not reused
+PROMPT_VERSION = prompt_version()
+
+def open_score_cache():
+    """Persistent score cache (TTL + LRU) shared by scorer.py and pipeline.py."""
+    return DiskCache("scores", ttl=SCORE_CACHE_TTL, max_entries=SCORE_CACHE_MAX_ENTRIES)
+
+def score_cache_key(article, model_name, scoring_context=None):
+    """Cache key: prompt version + model + the article fields the prompt sees."""
+    version = prompt_version(scoring_context) if scoring_context else PROMPT_VERSION
+    return make_key(version, model_name, article.get("title", ""), article.get("summary", ""),
+                    article.get("source", ""))
+
+def score_articles_batch(client, articles, start_id, model_name="gemini-3-flash-preview", ledger=None, cache=None,
+                         scoring_context=None):
     """
     Score a batch of articles using a single Gemini API call.
+
+    If an ArticleLedger is given, articles it has already scored are answered from
+    the ledger without calling Gemini, and new results are recorded in it.
+    If a score cache (open_score_cache()) is given, articles with the same title,
+    summary and source scored under the current prompt are answered from it.
+    scoring_context replaces SCORING_CONTEXT (e.g. a candidate rubric); it is part
+    of the cache key, so scores under different rubrics never mix.
     """
     if not articles:
         return []
 
-    # Format articles for the prompt
-    articles_text = ""
-    for i, article in enumerate(articles):
-        # Use simple ID relative to this batch (or global if we want, but passing start_id helps debugging)
-        article_id = start_id + i
-        articles_text += f"Article ID: {article_id}\n"
-        articles_text += f"Title: {article.get('title', 'Unknown')}\n"
-        articles_text += f"Source: {article.get('source', 'Unknown')}\n"
-        articles_text += f"Summary: {article.get('summary', '')}\n\n"
+    # Use simple ID relative to this batch (or global if we want, but passing start_id helps debugging)
+    indexed = [(start_id + i, article) for i, article in enumerate(articles)]
+
+    known = {}
+    if ledger is not None:
+        for a_id, article in indexed:
+            stored = ledger.get_score(article)
+            if stored:
+                known[a_id] = stored
+        if known:
+            print(f"  - {len(known)} article(s) already scored in ledger, skipping Gemini for them.")
+
+    cache_hits = []
+    if cache is not None:
+        for a_id, article in indexed:
+            if a_id in known:
+                continue
+            cached = cache.get(score_cache_key(article, model_name, scoring_context))
+            if cached:
+                known[a_id] = {
+                    "title": article.get("title"),
+                    "url": article.get("url"),
+                    "source": article.get("source"),
+                    "sources": article.get("sources", [article.get("source")]),
+                    "summary": article.get("summary", ""),
+                    "score": cached["score"],
+                    "reasoning": cached["reasoning"],
+                    "relevance": cached["relevance"]
+                }
+                cache_hits.append(known[a_id])
+        if cache_hits:
+            print(f"  - {len(cache_hits)} article(s) answered from the score cache.")
+
+    to_score = [(a_id, article) for a_id, article in indexed if a_id not in known]
+    fresh = _score_indexed_batch(client, to_score, model_name, scoring_context=scoring_context) if to_score else {}
+
+    if cache is not None:
+        for a_id, article in to_score:
+            res = fresh[a_id]
+            if res.get("relevance") != "error":
+                cache.set(score_cache_key(article, model_name, scoring_context),
+                          {"score": res["score"], "reasoning": res["reasoning"], "relevance": res["relevance"]})
+
+    if ledger is not None and (fresh or cache_hits):
+        # Cache hits are recorded too, so the ledger knows these articles are scored
+        ledger.record_scores(list(fresh.values()) + cache_hits)
+
+    return [known.get(a_id) or fresh[a_id] for a_id, _ in indexed]
+
+_END = object()  # Marks the end of the batch stream in score_batches()
 
-    prompt = BATCH_SCORING_PROMPT.format(articles_text=articles_text)
+def _timed_batch(*args, **kwargs):
+    """score_articles_batch() plus the seconds it took: (results, seconds)."""
+    started = time.monotonic()
+    results = score_articles_batch(*args, **kwargs)
+    return results, time.monotonic() - started
 
+def score_batches(client, batches, model_name="gemini-3-flash-preview", ledger=None, max_in_flight=SCORING_CONCURRENCY, cache=None,
+                  scoring_context=None, record_latency=None):
+    """
+    Score batches concurrently, yielding results in input order.
+
+    Up to max_in_flight batches are sent to Gemini at once; the batches iterable is
+    consumed lazily, so it can be a stream still being collected. It is read on a
+    separate thread, and only when a slot is free, so a finished batch is yielded
+    right away even while the stream is slow to produce the next one. Stopping the
+    iteration early (e.g. `break` on an early exit) cancels batches not yet started
+    and waits for the reader to finish its current pull, then closes the stream.
+
+    record_latency, if given, is called with the seconds each batch took from
+    dispatch to completion (failed batches excluded), just before it is yielded.
+
+    Yields:
+        (start_id, batch, results) - results is score_articles_batch() output for the batch,
+        or [] if the batch raised.
+    """
+    max_in_flight = max(1, max_in_flight)
+    executor = ThreadPoolExecutor(max_workers=max_in_flight)
+    slots = threading.Semaphore(max_in_flight)  # One per batch dispatched but not yet yielded
+    events = queue.Queue()  # Batches from the reader, _END / exception when it stops, None = a batch finished
+    stop = threading.Event()
+
+    def read_batches():
+        batch_iter = iter(batches)
+        try:
+            while True:
+                slots.acquire()
+                if stop.is_set():
+                    break
+                batch = next(batch_iter, None)
+                if batch is None or stop.is_set():
+                    break
+                events.put(batch)
+        except Exception as e:
+            events.put(e)
+        finally:
+            # A generator can only be closed by the thread running it, so an early stop closes it here
+            if stop.is_set() and hasattr(batch_iter, "close"):
+                try:
+                    batch_iter.close()
+                except Exception as e:
+                    print(f"Warning: Closing the batch stream failed: {e}", file=sys.stderr)
+        events.put(_END)
+
+    reader = threading.Thread(target=read_batches, daemon=True)
+    reader.start()
+    pending = deque()
+    next_id = 0
+    exhausted = False
+    stream_error = None
     try:
-        response = client.generate_content(prompt, model=model_name)
-        
-        if not response:
-            raise Exception("No response from Gemini API")
+        while pending or not exhausted:
+            if pending and pending[0][2].done():
+                start_id, batch, future = pending.popleft()
+                try:
+                    results, seconds = future.result()
+                    if record_latency is not None:
+                        record_latency(seconds)
+                except Exception as e:
+                    print(f"Error processing batch {start_id}: {e}", file=sys.stderr)
+                    results = []
+                slots.release()
+                yield start_id, batch, results
+                continue
 
-        result_text = response.text.strip()
-        
-        # Extract JSON
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].split("```")[0].strip()
-        
+            event = events.get()
+            if event is _END:
+                exhausted = True
+            elif isinstance(event, Exception):
+                # Hand back what is already in flight, then re-raise the stream's error
+                exhausted, stream_error = True, event
+            elif event is not None:
+                future = executor.submit(_timed_batch, client, event, next_id, model_name=model_name,
+                                         ledger=ledger, cache=cache, scoring_context=scoring_context)
+                future.add_done_callback(lambda _: events.put(None))
+                pending.append((next_id, event, future))
+                next_id += len(event)
+        if stream_error is not None:
+            raise stream_error
+    finally:
+        # Early exit: stop the reader, drop batches that have not started; in-flight ones still land in the ledger.
+        # Once this returns no other thread touches the batch stream, so the caller may close its sources.
+        stop.set()
+        slots.release()
+        executor.shutdown(wait=True, cancel_futures=True)
+        reader.join()
+
+def _format_article(article_id, article):
+    """One article's block in BATCH_SCORING_PROMPT."""
+    return (f"Article ID: {article_id}\n"
+            f"Title: {article.get('title', 'Unknown')}\n"
+            f"Source: {article.get('source', 'Unknown')}\n"
+            f"Summary: {compact(article.get('summary', ''), SCORING_SUMMARY_TOKENS)}\n\n")
+
+def parse_json_objects(text):
+    """
+    Tolerant parser for a JSON array of objects.
+
+    Returns every complete object it can read, so a response truncated or broken
+    mid-array still yields the objects before the damage. Code fences are ignored.
+    """
+    text = (text or "").strip()
+    if "```" in text:
+        text = re.sub(r'```(?:json)?', '', text)
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return [data]
+        return [item for item in data if isinstance(item, dict)]
+    except (json.JSONDecodeError, TypeError):
+        pass
+
+    decoder = json.JSONDecoder()
+    objects = []
+    pos = text.find("[") + 1
+    while True:
+        pos = text.find("{", pos)
+        if pos == -1:
+            break
         try:
-            results_list = json.loads(result_text)
+            obj, pos = decoder.raw_decode(text, pos)
         except json.JSONDecodeError:
-            # Fallback: sometimes Gemini returns just the object if only 1 item, or separate objects
-            print(f"JSON Decode Error in batch. Raw text: {result_text[:100]}...", file=sys.stderr)
-            raise
+            # Broken / truncated object: skip past it and try the next one
+            pos += 1
+            continue
+        if isinstance(obj, dict):
+            objects.append(obj)
+    return objects
 
-        scored_batch = []
-        
-        # Create a map of ID -> Result for safer mapping
-        result_map = {str(r.get("id")): r for r in results_list if "id" in r}
-        
-        # If mapping fails (e.g. Gemini didn't output IDs), assume order if lengths match
-        if len(result_map) != len(articles) and len(results_list) == len(articles):
-             # print("Warning: ID mismatch or missing IDs. Assuming sequential order.", file=sys.stderr)
-             result_map = {str(start_id + i): res for i, res in enumerate(results_list)}
-
-        for i, article in enumerate(articles):
-            a_id = start_id + i
-            res = result_map.get(str(a_id))
-            
-            if res:
-                scored_batch.append({
-                    "title": article.get("title"),
-                    "url": article.get("url"),
-                    "source": article.get("source"),
-                    "summary": article.get("summary", ""),
-                    "score": res.get("score", 0),
-                    "reasoning": res.get("reasoning", ""),
-                    "relevance": res.get("relevance", "low")
-                })
-            else:
-                 # Fallback if specific article missing from batch response
-                 print(f"Warning: Article {a_id} missing from batch response. Scoring individually...", file=sys.stderr)
-                 scored_batch.append(score_single_article(client, article, model_name))
+def _scored_result(article, res):
+    try:
+        score = int(res.get("score", 0))
+    except (TypeError, ValueError):
+        score = 0
+    return {
+        "title": article.get("title"),
+        "url": article.get("url"),
+        "source": article.get("source"),
+        "sources": article.get("sources", [article.get("source")]),
+        "summary": article.get("summary", ""),
+        "score": score,
+        "reasoning": res.get("reasoning", ""),
+        "relevance": res.get("relevance", "low")
+    }
+
+def _error_result(article, message):
+    # relevance "error" is never recorded in the ledger / cache, so the article is retried next run
+    return {
+        "title": article.get("title"),
+        "url": article.get("url"),
+        "source": article.get("source"),
+        "sources": article.get("sources", [article.get("source")]),
+        "summary": article.get("summary", ""),
+        "score": 0,
+        "reasoning": f"Error: {message}",
+        "relevance": "error"
+    }
 
-        return scored_batch
+def _score_indexed_batch(client, indexed_articles, model_name, retry_missing=True, scoring_context=None):
+    """
+    Score [(id, article), ...] in one Gemini call. Returns {id: result}.
 
+    The response is schema-constrained JSON. Valid objects are salvaged from a
+    truncated or malformed answer, and only the missing IDs are sent again, once,
+    as a single smaller batch.
+    """
+    # Format articles for the prompt
+    articles_text = "".join(_format_article(article_id, article) for article_id, article in indexed_articles)
+
+    prompt = (scoring_context or SCORING_CONTEXT) + BATCH_SCORING_INSTRUCTIONS.format(articles_text=articles_text)
+
+    results_list = []
+    error = "missing from batch response"
+    try:
+        response = client.generate_content(prompt, model=model_name, config=BATCH_SCORING_CONFIG)
+        if not response:
+            raise Exception("No response from Gemini API")
+        results_list = parse_json_objects(response.text)
     except Exception as e:
-        print(f"Batch scoring failed: {e}. Falling back to individual scoring.", file=sys.stderr)
-        # Fallback to individual scoring upon batch failure
-        fallback_results = []
-        for article in articles:
-            fallback_results.append(score_single_article(client, article, model_name))
-        return fallback_results
+        error = str(e)
+        print(f"Batch scoring failed: {e}", file=sys.stderr)
+
+    # Create a map of ID -> Result for safer mapping
+    result_map = {str(r.get("id")): r for r in results_list if "id" in r}
+
+    # If mapping fails (e.g. Gemini didn't output IDs), assume order if lengths match
+    if len(result_map) != len(indexed_articles) and len(results_list) == len(indexed_articles):
+        result_map = {str(a_id): res for (a_id, _), res in zip(indexed_articles, results_list)}
+
+    scored_batch = {}
+    missing = []
+    for a_id, article in indexed_articles:
+        res = result_map.get(str(a_id))
+        if res:
+            scored_batch[a_id] = _scored_result(article, res)
+        else:
+            missing.append((a_id, article))
+
+    if missing:
+        if retry_missing:
+            print(f"Warning: {len(missing)} of {len(indexed_articles)} article(s) missing from batch response. "
+                  f"Re-batching them once...", file=sys.stderr)
+            scored_batch.update(_score_indexed_batch(client, missing, model_name, retry_missing=False,
+                                                     scoring_context=scoring_context))
+        else:
+            for a_id, article in missing:
+                scored_batch[a_id] = _error_result(article, error)
+
+    return scored_batch
 
 def score_single_article(client, article, model_name="gemini-3-flash-preview"):
     """Score a single article (fallback or legacy usage)."""
     prompt = SINGLE_SCORING_PROMPT.format(
         title=article.get("title", ""),
-        summary=article.get("summary", ""),
+        summary=compact(article.get("summary", ""), SCORING_SUMMARY_TOKENS),
         source=article.get("source", "")
     )
     
@@ -190,6 +466,7 @@ def score_single_article(client, article, model_name="gemini-3-flash-preview"):
             "title": article.get("title"),
             "url": article.get("url"),
             "source": article.get("source"),
+            "sources": article.get("sources", [article.get("source")]),
             "summary": article.get("summary", ""),
             "score": result.get("score", 0),
             "reasoning": result.get("reasoning", ""),
@@ -201,46 +478,107 @@ def score_single_article(client, article, model_name="gemini-3-flash-preview"):
             "title": article.get("title"),
             "url": article.get("url"),
             "source": article.get("source"),
+            "sources": article.get("sources", [article.get("source")]),
             "summary": article.get("summary", ""),
             "score": 0,
             "reasoning": f"Error: {str(e)}",
             "relevance": "error"
         }
 
+def iter_articles(path):
+    """
+    Yield articles from collector output.
+
+    Accepts a JSON array file, or JSONL (one article per line) from a file or
+    stdin ("-"). JSONL is read lazily, so scoring can start while the
+    collector is still writing.
+    """
+    if path == "-":
+        f = sys.stdin
+    else:
+        f = open(path, 'r', encoding='utf-8')
+
+    try:
+        first = ""
+        for line in f:
+            if line.strip():
+                first = line
+                break
+
+        if first.lstrip().startswith("["):
+            # Plain JSON array (collector.py --format json)
+            for article in json.loads(first + f.read()):
+                yield article
+            return
+
+        lines = [first] if first else []
+        for line in itertools.chain(lines, f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Warning: Skipping malformed JSONL line: {e}", file=sys.stderr)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def iter_token_batches(articles, token_budget=BATCH_TOKEN_BUDGET, max_items=MAX_BATCH_ITEMS):
+    """
+    Pack any iterable of articles into batches by estimated prompt tokens.
+
+    A batch is closed when the next article would exceed token_budget or the batch
+    holds max_items articles. An article larger than the whole budget is sent on its own.
+    """
+    batch = []
+    batch_tokens = 0
+    for article in articles:
+        tokens = estimate_tokens(_format_article(0, article))
+        if batch and (batch_tokens + tokens > token_budget or len(batch) >= max_items):
+            yield batch
+            batch = []
+            batch_tokens = 0
+        batch.append(article)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
 def main():
     parser = argparse.ArgumentParser(description="Score articles for relevance to LogiShift.")
-    parser.add_argument("--input", type=str, help="Path to JSON file with articles (from collector.py)", required=True)
+    parser.add_argument("--input", type=str, help="Path to JSON/JSONL file with articles (from collector.py), or '-' for JSONL on stdin", required=True)
     parser.add_argument("--threshold", type=int, default=80, help="Minimum score to pass (default: 80)")
     parser.add_argument("--output", type=str, help="Output file for scored articles (optional)")
     parser.add_argument("--model", type=str, default="gemini-3-flash-preview", help="Gemini model to use")
+    parser.add_argument("--ledger", action="store_true", help="Reuse scores from the article ledger and record new ones")
+    parser.add_argument("--no-cache", action="store_true", help="Do not reuse or store scores in the persistent score cache")
+    parser.add_argument("--batch-token-budget", type=int, default=BATCH_TOKEN_BUDGET, help=f"Estimated article tokens per scoring request (default: {BATCH_TOKEN_BUDGET})")
+    parser.add_argument("--concurrency", type=int, default=SCORING_CONCURRENCY, help=f"Batches scored in parallel (default: {SCORING_CONCURRENCY})")
     
     args = parser.parse_args()
     
-    # Load articles
-    try:
-        with open(args.input, 'r', encoding='utf-8') as f:
-            articles = json.load(f)
-    except Exception as e:
-        print(f"Error loading input file: {e}", file=sys.stderr)
+    if args.input != "-" and not os.path.exists(args.input):
+        print(f"Error loading input file: {args.input} not found", file=sys.stderr)
         sys.exit(1)
     
     # Initialize Client ONCE
     try:
-        client = GeminiClient()
+        client = get_shared_client()
     except Exception as e:
         print(f"Fatal Error: Failed to initialize GeminiClient: {e}", file=sys.stderr)
         sys.exit(1)
 
-    print(f"Scoring {len(articles)} articles using {args.model} (Batch Size: 10)...")
+    ledger = ArticleLedger() if args.ledger else None
+    score_cache = None if args.no_cache else open_score_cache()
+
+    print(f"Scoring articles from {args.input} using {args.model} (Batch Budget: ~{args.batch_token_budget} tokens, Concurrency: {args.concurrency})...")
     
     scored_articles = []
-    batch_size = 10
     
-    for i in range(0, len(articles), batch_size):
-        batch = articles[i:i + batch_size]
-        print(f"[{i+1}-{min(i+batch_size, len(articles))}/{len(articles)}] Processing batch...")
-        
-        batch_results = score_articles_batch(client, batch, start_id=i, model_name=args.model)
+    batches = iter_token_batches(iter_articles(args.input), token_budget=args.batch_token_budget)
+    for i, batch, batch_results in score_batches(client, batches, model_name=args.model, ledger=ledger,
+                                                 max_in_flight=args.concurrency, cache=score_cache):
+        print(f"[{i+1}-{i+len(batch)}] Batch scored.")
         scored_articles.extend(batch_results)
         
         # Simple progress indication
@@ -253,8 +591,11 @@ def main():
     
     print(f"\n{'='*60}")
     print(f"Scoring complete!")
-    print(f"Total articles: {len(articles)}")
+    print(f"Total articles: {len(scored_articles)}")
     print(f"High-score articles (>={args.threshold}): {len(high_score_articles)}")
+    if score_cache is not None:
+        stats = score_cache.stats()
+        print(f"Score cache: {stats['hits']} hit(s), {stats['misses']} miss(es), {stats['entries']} entries")
     print(f"{'='*60}\n")
     
     # Display high-score articles
@@ -269,7 +610,7 @@ def main():
     if args.output:
         output_data = {
             "threshold": args.threshold,
-            "total": len(articles),
+            "total": len(scored_articles),
             "high_score_count": len(high_score_articles),
             "articles": scored_articles,
             "high_score_articles": high_score_articles
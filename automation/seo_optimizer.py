@@ -12,14 +12,14 @@ import re
 import json
 from datetime import datetime
 try:
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_shared_client
 except ImportError:
-    from gemini_client import GeminiClient
+    from gemini_client import get_shared_client
 
 
 class SEOOptimizer:
-    def __init__(self):
-        self.gemini = GeminiClient()
+    def __init__(self, gemini_client=None):
+        self.gemini = gemini_client or get_shared_client()
     
     def generate_meta_description(self, title, content, keyword):
         """
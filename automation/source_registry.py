@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Source Registry for LogiShift
+
+Single external list of news sources (sources.yaml by default, or an OPML
+export from a feed reader) holding each source's feed URL, content selectors,
+priority and minimum polling interval. collector.py and url_reader.py both
+read it, and shard() splits it between collector processes by a stable hash
+of the source name.
+"""
+
+import hashlib
+import os
+import re
+import xml.etree.ElementTree as ET
+
+import yaml
+
+DEFAULT_REGISTRY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sources.yaml")
+
+
+def _slug(text):
+    return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+
+
+def _shard_of(name, count):
+    """Stable shard index of a source name (same on every machine and run)."""
+    digest = hashlib.sha1(name.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def parse_shard(spec):
+    """Parse an "i/N" shard spec (0-based index) into (i, N)."""
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}' (expected i/N, e.g. 0/4)")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard '{spec}' (need 0 <= i < N)")
+    return index, count
+
+
+class SourceRegistry:
+    """
+    Ordered collection of sources. Each source is a dict:
+        {"url": str or None, "priority": int, "poll_interval_hours": float,
+         "enabled": bool, "selectors": {"content": ..., "title": ..., "author": ...} or None}
+    """
+
+    def __init__(self, sources):
+        self.sources = {}
+        for name, spec in sources.items():
+            spec = spec or {}
+            self.sources[name] = {
+                "url": spec.get("url"),
+                "priority": int(spec.get("priority", 0)),
+                "poll_interval_hours": float(spec.get("poll_interval_hours", 0)),
+                "enabled": bool(spec.get("enabled", True)),
+                "selectors": spec.get("selectors"),
+            }
+
+    @classmethod
+    def load(cls, path=DEFAULT_REGISTRY_PATH):
+        """Load a registry from YAML (.yaml/.yml) or OPML (.opml/.xml)."""
+        if path.lower().endswith((".opml", ".xml")):
+            return cls.from_opml(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+        return cls(data.get("sources") or {})
+
+    @classmethod
+    def from_opml(cls, path):
+        """Build a registry from an OPML subscription list (feed outlines only, no selectors)."""
+        sources = {}
+        for outline in ET.parse(path).iter("outline"):
+            url = outline.get("xmlUrl")
+            if not url:
+                continue
+            name = _slug(outline.get("title") or outline.get("text") or url)
+            if name in sources:
+                name = f"{name}_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:6]}"
+            sources[name] = {"url": url}
+        return cls(sources)
+
+    def feeds(self):
+        """Return {name: feed URL} of enabled sources, highest priority first."""
+        collectable = [(name, s) for name, s in self.sources.items() if s["enabled"] and s["url"]]
+        collectable.sort(key=lambda item: item[1]["priority"], reverse=True)
+        return {name: s["url"] for name, s in collectable}
+
+    def selectors(self):
+        """Return {name: selectors} for every source that defines content selectors."""
+        return {name: s["selectors"] for name, s in self.sources.items() if s["selectors"]}
+
+    def poll_intervals(self):
+        """Return {name: minimum hours between polls} for sources that set one."""
+        return {name: s["poll_interval_hours"] for name, s in self.sources.items() if s["poll_interval_hours"]}
+
+    def shard(self, index, count):
+        """Return the registry partition for shard index/count (stable hash of the source name)."""
+        return SourceRegistry({name: s for name, s in self.sources.items() if _shard_of(name, count) == index})
+
+
+_default_registry = None
+
+
+def get_registry():
+    """Return the default registry (sources.yaml), loaded once per process."""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = SourceRegistry.load(os.environ.get("LOGISHIFT_SOURCES", DEFAULT_REGISTRY_PATH))
+    return _default_registry
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Speculative Generation Prep for LogiShift Pipeline
+
+Starts the per-article preparation for generation (type classification, URL
+extraction, summarization) while scoring is still running. Only the current
+top --limit candidates are prepared; a candidate pushed out of the top by a
+later, higher-scoring article has its preparation cancelled.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PREP_WORKERS = 2
+
+
+class SpeculativePrep:
+    """
+    Keeps the top `limit` candidates (by score) prepared in the background.
+
+    Args:
+        prepare: callable(article) -> prepared dict, run on a worker thread
+        limit: Number of top candidates to keep prepared
+        max_workers: Concurrent preparations
+    """
+
+    def __init__(self, prepare, limit, max_workers=PREP_WORKERS):
+        self._prepare = prepare
+        self.limit = max(0, limit)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        self._lock = threading.Lock()
+        self._ranked = []  # [(-score, seq, url)]
+        self._seq = 0
+        self._futures = {}  # url -> Future
+        self.started = 0
+        self.cancelled = 0
+        self.wasted = 0  # Pushed out after preparation had already started
+
+    def offer(self, article):
+        """Consider a scored article; (re)rank and start / cancel preparations accordingly."""
+        url = article.get("url")
+        with self._lock:
+            if any(u == url for _, _, u in self._ranked):
+                return
+            self._ranked.append((-article.get("score", 0), self._seq, url))
+            self._seq += 1
+            self._ranked.sort()
+            self._ranked = self._ranked[:max(self.limit, 1) * 4]  # Keep a little history for ordering only
+
+            top = {u for _, _, u in self._ranked[:self.limit]}
+            if url in top and url not in self._futures:
+                self._futures[url] = self._executor.submit(self._prepare, article)
+                self.started += 1
+            for other in [u for u in self._futures if u not in top]:
+                future = self._futures.pop(other)
+                if future.cancel():
+                    self.cancelled += 1
+                elif not future.done():
+                    self.wasted += 1
+                print(f"Speculative prep: dropped {other} (pushed out of the top {self.limit}).")
+
+    def take(self, article):
+        """Return the prepared dict for an article (waiting if still running), or None if not prepared."""
+        with self._lock:
+            future = self._futures.pop(article.get("url"), None)
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"Speculative prep failed for {article.get('url')}: {e}")
+            return None
+
+    def shutdown(self):
+        """Cancel anything not taken and release the workers."""
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
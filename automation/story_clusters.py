@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Story Clustering for LogiShift
+
+Groups differently-worded copies of the same story (one event carried by
+several feeds) before scoring. Each article is turned into a sparse TF-IDF
+vector of its title and summary; a new article joins the most similar
+existing cluster when the cosine similarity clears a threshold, otherwise it
+starts a new cluster. Only cluster representatives are scored; the result is
+then propagated to the other members.
+
+Representative vectors are weighted and normalized once, with the IDF known
+when they start their cluster, and kept in an inverted index, so adding an
+article only touches the representatives that share a term with it.
+
+Exact copies (same canonical URL or headline) are already merged earlier by
+dedupe.StoryIndex; this catches rewrites of the same press release.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+
+try:
+    from automation.prompt_compactor import compact
+except ImportError:
+    from prompt_compactor import compact
+
+SIMILARITY_THRESHOLD = 0.55  # Cosine similarity to join an existing cluster
+TITLE_WEIGHT = 2.0  # Title terms count double
+SUMMARY_TOKENS = 200
+
+_CJK = re.compile(r'[\u3040-\u30ff\u4e00-\u9fff]')
+STOPWORDS = set("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+new says said after over into amid about more than up out its their they he she we you
+""".split())
+
+
+def _tokens(text):
+    words = re.findall(r'\w+', text.casefold())
+    tokens = [w for w in words if not _CJK.search(w) and w not in STOPWORDS and len(w) > 1]
+    for word in words:
+        if _CJK.search(word):
+            tokens += [word[i:i + 2] for i in range(max(1, len(word) - 1))]
+    return tokens
+
+
+class StoryClusterer:
+    """Online TF-IDF cosine clustering of one run's collected articles."""
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._df = Counter()
+        self._n_docs = 0
+        self._postings = defaultdict(list)  # term -> [(representative index, normalized weight)]
+        self.representatives = []
+        self.members = {}  # representative index -> [member articles]
+
+    def _vector(self, article):
+        """Term counts of an article (title terms weighted)."""
+        tf = Counter()
+        for token in _tokens(article.get("title") or ""):
+            tf[token] += TITLE_WEIGHT
+        for token in _tokens(compact(article.get("summary") or "", SUMMARY_TOKENS)):
+            tf[token] += 1.0
+        return tf
+
+    def _weighted(self, tf):
+        """L2-normalized TF-IDF vector under the current document frequencies."""
+        vector = {t: count * (math.log((1.0 + self._n_docs) / (1.0 + self._df[t])) + 1.0) for t, count in tf.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values()))
+        return {t: w / norm for t, w in vector.items()}
+
+    def add(self, article):
+        """
+        Cluster an article.
+
+        Returns:
+            (representative, is_new) - is_new is True if the article starts a new cluster
+            (and should be scored); otherwise it was attached to the returned representative.
+        """
+        tf = self._vector(article)
+        self._df.update(tf.keys())
+        self._n_docs += 1
+        if not tf:
+            self.representatives.append(article)
+            return article, True
+
+        query = self._weighted(tf)
+        similarities = defaultdict(float)
+        for term, weight in query.items():
+            for index, rep_weight in self._postings.get(term, ()):
+                similarities[index] += weight * rep_weight
+        if similarities:
+            best = max(similarities, key=similarities.get)
+            if similarities[best] >= self.threshold:
+                self.members.setdefault(best, []).append(article)
+                return self.representatives[best], False
+
+        index = len(self.representatives)
+        for term, weight in query.items():
+            self._postings[term].append((index, weight))
+        self.representatives.append(article)
+        return article, True
+
+    @property
+    def clustered_count(self):
+        """Number of articles attached to another article's cluster (not scored themselves)."""
+        return sum(len(m) for m in self.members.values())
+
+    def propagate(self, scored_results):
+        """
+        Copy each scored representative's result to its cluster members.
+
+        The representative's result gets every member's sources appended. Returns the
+        member results (same shape as scorer output) for representatives that were scored
+        without error; members of unscored clusters are left out.
+        """
+        by_url = {res.get("url"): res for res in scored_results}
+        member_results = []
+        for index, members in self.members.items():
+            rep_result = by_url.get(self.representatives[index].get("url"))
+            if rep_result is None or rep_result.get("relevance") == "error":
+                continue
+            sources = rep_result.setdefault("sources", [rep_result.get("source")])
+            for member in members:
+                for source in member.get("sources") or [member.get("source")]:
+                    if source and source not in sources:
+                        sources.append(source)
+                member_results.append({
+                    "title": member.get("title"),
+                    "url": member.get("url"),
+                    "source": member.get("source"),
+                    "sources": member.get("sources", [member.get("source")]),
+                    "summary": member.get("summary", ""),
+                    "score": rep_result["score"],
+                    "reasoning": rep_result["reasoning"],
+                    "relevance": rep_result["relevance"],
+                    "cluster_of": rep_result.get("url")
+                })
+        return member_results
@@ -11,11 +11,13 @@ import sys
 import json
 from dotenv import load_dotenv
 try:
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_shared_client
+    from automation.prompt_compactor import compact, SUMMARIZER_CONTENT_TOKENS
 except ImportError:
     import sys
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-    from automation.gemini_client import GeminiClient
+    from automation.gemini_client import get_shared_client
+    from automation.prompt_compactor import compact, SUMMARIZER_CONTENT_TOKENS
 
 SUMMARIZATION_PROMPT = """You are the "Editor-in-Chief" of LogiShift Global, a logistics DX media.
 Summarize the following article and extract key insights for our target audience (Global Logistics Managers & Supply Chain Executives).
@@ -43,7 +45,7 @@ Output ONLY the following JSON format:
 """
 
 
-def summarize_article(content: str, title: str, model_name: str = "gemini-3-flash-preview") -> dict:
+def summarize_article(content: str, title: str, model_name: str = "gemini-3-flash-preview", client=None) -> dict:
     """
     Summarize article content and extract key facts.
     
@@ -51,16 +53,18 @@ def summarize_article(content: str, title: str, model_name: str = "gemini-3-flas
         content: Article content
         title: Article title
         model_name: Gemini model to use
+        client: GeminiClient to use (default: the process-wide shared client)
     
     Returns:
         Dictionary with keys: summary, key_facts, logishift_angle
     """
     print(f"Summarizing article: {title[:50]}...")
     
-    # Removed content truncation to support long articles with Gemini 1.5+
+    # Long articles are still supported: the budget is generous, compaction mostly removes markup/boilerplate
+    content = compact(content, SUMMARIZER_CONTENT_TOKENS)
     
     try:
-        client = GeminiClient()
+        client = client or get_shared_client()
     except Exception as e:
         print(f"Error initializing GeminiClient: {e}")
         return {
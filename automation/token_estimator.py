@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Token Estimator for LogiShift
+
+Fast local estimate of Gemini token counts, used to size prompts without a
+count_tokens round trip. Latin text averages about 4 characters per token;
+Japanese / Chinese characters are close to one token each. The estimate errs
+on the high side so budgets are not exceeded.
+"""
+
+import re
+
+_CJK = re.compile(r'[\u3040-\u30ff\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+CHARS_PER_TOKEN = 4.0
+CJK_TOKENS_PER_CHAR = 1.0
+
+
+def estimate_tokens(text):
+    """Estimated token count of a string (0 for empty / None)."""
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    other = len(text) - cjk
+    return int(cjk * CJK_TOKENS_PER_CHAR + other / CHARS_PER_TOKEN) + 1
+
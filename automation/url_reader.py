@@ -11,89 +11,15 @@ from bs4 import BeautifulSoup
 from typing import Dict, Optional
 import sys
 
-# Content selectors for each source
-CONTENT_SELECTORS = {
-    "techcrunch": {
-        "content": "div.article-content",
-        "title": "h1",
-        "author": "a[rel='author']",
-    },
-    "wsj_logistics": {
-        "content": "div.article-content",
-        "title": "h1.wsj-article-headline",
-        "author": "span.author-name",
-    },
-    "lnews": {
-        "content": "div.entry-content",
-        "title": "h1.entry-title",
-        "author": "span.author",
-    },
-    "logistics_today": {
-        "content": "div.entry-content",
-        "title": "h1.entry-title",
-        "author": "span.author",
-    },
-    "logi_biz": {
-        "content": "div.entry-content",
-        "title": "h1.entry-title",
-        "author": "span.author",
-    },
-    "supply_chain_dive": {
-        "content": "div.article-body",
-        "title": "h1.article-title",
-        "author": "span.author-name",
-    },
-    "logistics_mgmt": {
-        "content": "div.article-body",
-        "title": "h1",
-        "author": "span.author",
-    },
-    "freightwaves": {
-        "content": "div.entry-content",
-        "title": "h1.entry-title",
-        "author": "a.author",
-    },
-    "robot_report": {
-        "content": "div.entry-content",
-        "title": "h1",
-        "author": ".entry-author",
-    },
-    "supply_chain_brain": {
-        "content": "div.editorial-content__body", # Updated from div.body
-        "title": "h1",
-        "author": ".author",
-    },
-    "robotics_automation_news": {
-        "content": "div.entry-content",
-        "title": "h1",
-        "author": ".entry-author",
-    },
-    "36kr_japan": {
-        "content": "div.entry-content",
-        "title": "h1",
-        "author": ".post-author",
-    },
-    "pandaily": {
-        "content": "div.prose",
-        "title": "h1",
-        "author": "div.flex.items-center span",
-    },
-    "the_loadstar": {
-        "content": "div.entry-content", # Changed from article-body
-        "title": "h1",
-        "author": ".author",
-    },
-    "logistics_manager_uk": {
-        "content": "div.entry-content",
-        "title": "h1",
-        "author": "a[rel='author']",
-    },
-    "supply_chain_asia": {
-        "content": "div.entry-content",
-        "title": "h1",
-        "author": ".author",
-    },
-}
+try:
+    from automation.politeness import get_scheduler
+    from automation.source_registry import get_registry
+except ImportError:
+    from politeness import get_scheduler
+    from source_registry import get_registry
+
+# Content selectors for each source (from sources.yaml)
+CONTENT_SELECTORS = get_registry().selectors()
 
 
 def extract_content(url: str, source: str) -> Dict[str, str]:
@@ -125,7 +51,8 @@ def extract_content(url: str, source: str) -> Dict[str, str]:
         headers = {
             "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
         }
-        response = requests.get(url, headers=headers, timeout=10)
+        # Shared per-host scheduler: same-host fetches are spaced out, other hosts proceed in parallel
+        response = get_scheduler().get(url, headers=headers, timeout=10)
         response.raise_for_status()
         
         # Parse HTML
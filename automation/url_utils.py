@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+URL / Content Key Helpers for LogiShift
+
+Produces stable keys for collected articles so the same item can be
+recognized across runs and sources.
+"""
+
+import hashlib
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that only track the click, never identify the content
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "mc_cid", "mc_eid",
+    "_hsenc", "_hsmi", "mkt_tok", "cmpid", "ncid", "sr_share", "guccounter",
+    "guce_referrer", "guce_referrer_sig", "ref_src", "smid", "tpcc",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_", "hsa_")
+
+# Redirect wrappers whose real target is carried in a query parameter: host -> (path prefix, param)
+KNOWN_REDIRECTS = {
+    "google.com": ("/url", "q"),
+    "l.facebook.com": ("/l.php", "u"),
+    "lm.facebook.com": ("/l.php", "u"),
+    "out.reddit.com": ("/", "url"),
+    "t.umblr.com": ("/redirect", "z"),
+    "l.instagram.com": ("/", "u"),
+    "linkedin.com": ("/redir/redirect", "url"),
+}
+
+# Host prefixes that serve the same article as the bare domain
+HOST_PREFIXES = ("www.", "m.", "amp.")
+
+
+def _strip_host(netloc):
+    """Lowercase the host, drop default ports and mirror prefixes (www./m./amp.)."""
+    host = netloc.lower().split("@")[-1]
+    if host.endswith(":80") or host.endswith(":443"):
+        host = host.rsplit(":", 1)[0]
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    return host
+
+
+def _unwrap_redirect(url, max_hops=3):
+    """Resolve known redirect wrappers (e.g. google.com/url?q=...) without a network call."""
+    for _ in range(max_hops):
+        parts = urlsplit(url)
+        rule = KNOWN_REDIRECTS.get(_strip_host(parts.netloc))
+        if not rule:
+            return url
+        path_prefix, param = rule
+        if not parts.path.startswith(path_prefix):
+            return url
+        target = dict(parse_qsl(parts.query)).get(param)
+        if not target or not target.startswith("http"):
+            return url
+        url = target
+    return url
+
+
+def clean_url(url):
+    """
+    Fetchable form of an article URL: resolves known redirect wrappers, strips
+    tracking parameters (utm_*, fbclid, ...) and drops the fragment.
+    Scheme and host are left as published.
+    """
+    if not url:
+        return ""
+
+    url = _unwrap_redirect(url.strip())
+    parts = urlsplit(url)
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+def canonicalize_url(url):
+    """
+    Canonical form of an article URL, used to merge copies of the same story.
+
+    On top of clean_url():
+    - Sorts the remaining query parameters
+    - Normalizes host (lowercase, no www./m./amp., no default port) and scheme (https)
+    - Drops a trailing /amp and the trailing slash
+    """
+    if not url:
+        return ""
+
+    parts = urlsplit(clean_url(url))
+    query = sorted(parse_qsl(parts.query, keep_blank_values=True))
+
+    path = re.sub(r'/+', '/', parts.path)
+    if path.endswith("/amp") or path.endswith("/amp/"):
+        path = path.rstrip("/")[:-len("/amp")]
+    path = path.rstrip("/") or "/"
+
+    return urlunsplit(("https", _strip_host(parts.netloc), path, urlencode(query), ""))
+
+
+def normalize_url(url):
+    """Normalize a URL into a stable lookup key (its canonical form)."""
+    return canonicalize_url(url)
+
+
+def _normalize_text(text):
+    """Casefold, strip HTML tags and collapse whitespace/punctuation."""
+    text = re.sub(r'<[^<]+?>', ' ', text or "")
+    text = re.sub(r'[^\w]+', ' ', text.casefold())
+    return " ".join(text.split())
+
+
+def content_hash(title, summary=""):
+    """Hash of the normalized title + summary (stable across runs)."""
+    key = _normalize_text(title) + "\n" + _normalize_text(summary)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def title_hash(title, min_words=4, min_chars=12):
+    """
+    Hash of the normalized headline, used to merge the same story across sources.
+    Returns None for headlines too short/generic to identify a story on their own.
+    """
+    normalized = _normalize_text(title)
+    # Space-separated scripts use word count; CJK headlines use character count
+    if re.search(r'[\u3040-\u30ff\u4e00-\u9fff]', normalized):
+        if len(normalized.replace(" ", "")) < min_chars:
+            return None
+    elif len(normalized.split()) < min_words:
+        return None
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
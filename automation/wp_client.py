@@ -148,7 +148,7 @@ class WordPressClient:
             print(f"Error fetching/creating tag {slug}: {e}")
             return None
 
-    def get_posts(self, limit=10, category=None, tag=None, status="publish", after=None):
+    def get_posts(self, limit=10, category=None, tag=None, status="publish", after=None, page=None):
         """
         Retrieve recent posts from WordPress.
         
@@ -158,6 +158,7 @@ class WordPressClient:
             tag: Filter by tag ID (int)
             status: Filter by post status (default: "publish")
             after: ISO 8601 date string to filter posts published after this date
+            page: Page number for paginating through results (1-based, optional)
             
         Returns:
             List of posts (dict) or None if error
@@ -178,6 +179,8 @@ class WordPressClient:
                 params["tags"] = tag
             if after:
                 params["after"] = after
+            if page:
+                params["page"] = page
                 
             response = requests.get(url, params=params, auth=self.auth)
             response.raise_for_status()